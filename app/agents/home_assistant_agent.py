@@ -111,6 +111,11 @@ class HomeAssistantAgent:
         self.guardrails = SafetyGuardrails()
         self.fast_executor = FastPathExecutor()
 
+    async def aclose(self) -> None:
+        """Close the HTTP clients held by the tools and the fast path."""
+        await self.tools.aclose()
+        await self.fast_executor.aclose()
+
     def _validate_system_prompt_template(self) -> None:
         """Fail fast if the system prompt has unexpected format placeholders."""
         formatter = string.Formatter()
@@ -307,4 +312,7 @@ class HomeAssistantAgent:
 async def chat(message: str, session_id: str = "default") -> str:
     """Quick function to chat with the agent."""
     agent = HomeAssistantAgent()
-    return await agent.run(message, session_id)
+    try:
+        return await agent.run(message, session_id)
+    finally:
+        await agent.aclose()
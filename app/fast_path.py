@@ -24,6 +24,10 @@ class FastPathExecutor:
         self.client = HomeAssistantClient()
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+
+    async def aclose(self) -> None:
+        """Close the Home Assistant client."""
+        await self.client.aclose()
     
     async def execute(self, intent: ClassifiedIntent) -> ExecutionResult:
         """Execute a classified intent with verification and retry."""
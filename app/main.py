@@ -43,6 +43,10 @@ async def lifespan(app: FastAPI):
     yield
 
     # Shutdown
+    try:
+        await clear_agent_cache()
+    except Exception as e:
+        logger.warning(f"Closing agent clients failed: {e}")
     try:
         from app.patterns.scheduler import stop_pattern_scheduler
         stop_pattern_scheduler()
@@ -95,10 +99,12 @@ def get_agent():
     return _agent
 
 
-def clear_agent_cache():
-    """Clear the agent cache. Call after settings change."""
+async def clear_agent_cache():
+    """Clear the agent cache and close its HTTP clients. Call after settings change."""
     global _agent
-    _agent = None
+    agent, _agent = _agent, None
+    if agent is not None:
+        await agent.aclose()
 
 
 def _infer_domains_from_text(text):
@@ -2183,12 +2189,16 @@ async def get_ui_devices():
         }
 
     state_map = {}
+    client = None
     try:
         client = HomeAssistantClient()
         states = await client.get_states()
         state_map = {s.entity_id: s.state for s in states}
     except Exception:
         state_map = {}
+    finally:
+        if client:
+            await client.aclose()
 
     devices = []
     for entity in index.entities:
@@ -2586,7 +2596,7 @@ async def refresh_entities():
     success, error = await cache.fetch_and_cache(settings.ha_url, settings.ha_token)
 
     # Also clear the agent cache so it picks up new entities
-    clear_agent_cache()
+    await clear_agent_cache()
 
     if success:
         index = cache.load()
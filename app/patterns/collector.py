@@ -2,8 +2,9 @@
 
 import logging
 import time
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import AsyncIterator, Optional
 
 import httpx
 
@@ -33,10 +34,26 @@ class EventCollector:
         "humidifier",
     }
 
-    def __init__(self, ha_url: str, ha_token: str):
+    def __init__(
+        self,
+        ha_url: str,
+        ha_token: str,
+        client: Optional[httpx.AsyncClient] = None,
+    ):
         self.ha_url = ha_url.rstrip("/")
         self.ha_token = ha_token
         self.db = get_pattern_db()
+        # Optional shared client so syncs reuse an existing connection pool
+        self._client = client
+
+    @asynccontextmanager
+    async def _http_client(self) -> AsyncIterator[httpx.AsyncClient]:
+        """Yield the injected HTTP client, or a temporary one if none was given."""
+        if self._client is not None and not self._client.is_closed:
+            yield self._client
+            return
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            yield client
 
     def record_assistant_event(
         self,
@@ -75,12 +92,13 @@ class EventCollector:
             response.raise_for_status()
             states = response.json()
 
-            # Filter to tracked domains
+            # Filter to tracked domains (partition avoids a list per entity)
+            tracked = self.TRACKED_DOMAINS
             entity_ids = []
             for state in states:
                 entity_id = state.get("entity_id", "")
-                domain = entity_id.split(".")[0] if "." in entity_id else ""
-                if domain in self.TRACKED_DOMAINS:
+                domain, dot, _ = entity_id.partition(".")
+                if dot and domain in tracked:
                     entity_ids.append(entity_id)
 
             return entity_ids
@@ -114,7 +132,7 @@ class EventCollector:
         end_ts = datetime.utcnow()
 
         try:
-            async with httpx.AsyncClient(timeout=60.0) as client:
+            async with self._http_client() as client:
                 # If no entity_ids provided, fetch tracked entities from HA
                 if not entity_ids:
                     entity_ids = await self._get_tracked_entity_ids(client)
@@ -141,6 +159,7 @@ class EventCollector:
                         "Content-Type": "application/json",
                     },
                     params=params,
+                    timeout=60.0,
                 )
                 response.raise_for_status()
                 history_data = response.json()
@@ -148,17 +167,15 @@ class EventCollector:
             # Parse and filter events
             events = self._parse_history_data(history_data)
 
-            # Deduplicate against existing events
-            events = self._deduplicate_events(events)
-
-            if events:
-                self.db.insert_events_batch(events)
+            # Events already stored (e.g. from the sync overlap) are skipped
+            # by the database's unique index
+            inserted = self.db.insert_events_batch(events)
 
             duration_ms = int((time.time() - start_time) * 1000)
-            self.db.update_sync_metadata(end_ts, len(events), duration_ms)
+            self.db.update_sync_metadata(end_ts, inserted, duration_ms)
 
-            logger.info(f"Synced {len(events)} events in {duration_ms}ms")
-            return len(events), None
+            logger.info(f"Synced {inserted} events in {duration_ms}ms")
+            return inserted, None
 
         except httpx.HTTPStatusError as e:
             error_msg = f"HTTP {e.response.status_code}: {e.response.text[:200]}"
@@ -260,42 +277,11 @@ class EventCollector:
 
         return EventSource.UNKNOWN
 
-    def _deduplicate_events(self, events: list[DeviceEvent]) -> list[DeviceEvent]:
-        """Remove events that already exist in the database."""
-        if not events:
-            return []
-
-        # Get existing events in the time range of new events
-        min_ts = min(e.timestamp for e in events)
-        max_ts = max(e.timestamp for e in events)
-
-        existing = self.db.get_events_in_range(
-            min_ts - timedelta(minutes=1),
-            max_ts + timedelta(minutes=1),
-        )
-
-        # Create set of (entity_id, timestamp, new_state) for quick lookup
-        existing_keys = {
-            (e.entity_id, e.timestamp.isoformat()[:19], e.new_state)
-            for e in existing
-        }
-
-        # Filter out duplicates
-        unique_events = [
-            e
-            for e in events
-            if (e.entity_id, e.timestamp.isoformat()[:19], e.new_state)
-            not in existing_keys
-        ]
-
-        if len(unique_events) < len(events):
-            logger.debug(
-                f"Deduplicated {len(events) - len(unique_events)} events"
-            )
-
-        return unique_events
-
 
-def get_event_collector(ha_url: str, ha_token: str) -> EventCollector:
+def get_event_collector(
+    ha_url: str,
+    ha_token: str,
+    client: Optional[httpx.AsyncClient] = None,
+) -> EventCollector:
     """Create an EventCollector instance."""
-    return EventCollector(ha_url, ha_token)
+    return EventCollector(ha_url, ha_token, client=client)
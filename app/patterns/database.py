@@ -3,10 +3,12 @@
 import json
 import sqlite3
 from contextlib import contextmanager
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Generator, Optional
 
+import orjson
+
 from app.patterns.models import (
     DetectedPattern,
     DeviceEvent,
@@ -14,37 +16,219 @@ from app.patterns.models import (
     PatternType,
 )
 
+_EPOCH = datetime(1970, 1, 1)
+_ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_epoch_us(dt: datetime) -> int:
+    """Convert a datetime to integer microseconds since the Unix epoch.
+
+    Naive datetimes are taken to be UTC, like everywhere else in this package.
+    """
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _ONE_MICROSECOND
+
+
+def _from_epoch_us(us: int) -> datetime:
+    """Convert integer epoch microseconds back to a naive UTC datetime."""
+    return _EPOCH + timedelta(microseconds=us)
+
+
+# Remaining datetime columns (pattern and sync bookkeeping) are stored as ISO
+# text. Let sqlite3 convert on the way in, and on the way out for columns
+# selected as "name [timestamp]" (PARSE_COLNAMES).
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_converter(
+    "timestamp", lambda value: datetime.fromisoformat(value.decode())
+)
+
+# INSERT ... RETURNING needs SQLite 3.35+; older builds fall back to lastrowid
+_HAS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Columns identifying an event; timestamps are compared to the whole second
+_EVENT_DEDUP_KEY = "entity_id, timestamp / 1000000, new_state"
+
+_PATTERN_COLUMNS = """id, pattern_type, entity_ids, pattern_data, confidence,
+    occurrence_count, first_seen AS "first_seen [timestamp]",
+    last_seen AS "last_seen [timestamp]", is_active, suggestion_generated"""
+
+
+def _dump_attributes(attributes: Optional[dict]) -> Optional[str]:
+    """Serialize event attributes for the attributes_json column."""
+    if not attributes:
+        return None
+    # HA attributes may use non-string keys, which json.dumps also accepted
+    return orjson.dumps(attributes, option=orjson.OPT_NON_STR_KEYS).decode()
+
 
 class PatternDatabase:
     """SQLite database for device usage patterns."""
 
     DB_FILE = "usage_patterns.db"
-
-    def __init__(self):
-        from app.config import is_addon_mode
-        self.DB_DIR = Path("/data/app_data") if is_addon_mode() else Path("data")
-        self.db_path = self.DB_DIR / self.DB_FILE
-        self.DB_DIR.mkdir(parents=True, exist_ok=True)
+    MEMORY_PATH = ":memory:"
+
+    def __init__(self, db_path: Optional[Path | str] = None):
+        if db_path is None:
+            from app.config import is_addon_mode
+            self.DB_DIR = Path("/data/app_data") if is_addon_mode() else Path("data")
+            self.DB_DIR.mkdir(parents=True, exist_ok=True)
+            db_path = self.DB_DIR / self.DB_FILE
+        self.db_path = db_path
+        # Every connect(":memory:") opens a new empty database, so an
+        # in-memory database keeps a single connection for its lifetime
+        self._memory_conn: Optional[sqlite3.Connection] = None
         self._init_database()
 
-    @contextmanager
-    def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
-        """Context manager for database connections."""
+    def _connect(self) -> sqlite3.Connection:
+        """Open a configured connection to the database."""
         conn = sqlite3.connect(
-            str(self.db_path), detect_types=sqlite3.PARSE_DECLTYPES
+            str(self.db_path),
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            cached_statements=256,
         )
         conn.row_factory = sqlite3.Row
+        # Per-connection settings: with WAL, NORMAL only fsyncs at checkpoints,
+        # and temp b-trees (GROUP BY/ORDER BY) stay in RAM
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    @contextmanager
+    def _get_connection(self) -> Generator[sqlite3.Connection, None, None]:
+        """Context manager for database connections."""
+        if str(self.db_path) == self.MEMORY_PATH:
+            if self._memory_conn is None:
+                self._memory_conn = self._connect()
+            try:
+                yield self._memory_conn
+            except BaseException:
+                # Don't leave a half-done write open on the shared connection
+                self._memory_conn.rollback()
+                raise
+            return
+
+        conn = self._connect()
         try:
             yield conn
         finally:
             conn.close()
 
+    @contextmanager
+    def transaction(self) -> Generator[sqlite3.Connection, None, None]:
+        """Run several statements on one connection in a single write transaction.
+
+        Commits once on success and rolls back on error.
+        """
+        with self._get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
     def _init_database(self) -> None:
         """Initialize database schema if needed."""
         with self._get_connection() as conn:
-            conn.executescript(self._get_schema_sql())
+            if str(self.db_path) != self.MEMORY_PATH:
+                # Persisted in the file: readers no longer block the writer and
+                # each commit appends to the WAL instead of rewriting a journal
+                conn.execute("PRAGMA journal_mode=WAL")
+            if self._has_text_event_timestamps(conn):
+                self._migrate_event_timestamps(conn)
+            else:
+                conn.executescript(self._get_schema_sql())
+            self._ensure_unique_events_index(conn)
             conn.commit()
 
+    def _ensure_unique_events_index(self, conn: sqlite3.Connection) -> None:
+        """Create the unique event index, dropping duplicates stored before it existed.
+
+        Events match to the second, so the history copy of a change already
+        recorded by the assistant (a few milliseconds apart) counts as a duplicate.
+        """
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_events_dedup'"
+        ).fetchone()
+        if exists:
+            return
+        # Superseded exact-timestamp index
+        conn.execute("DROP INDEX IF EXISTS idx_events_unique")
+        conn.execute(
+            f"""DELETE FROM device_events WHERE id NOT IN (
+                   SELECT MIN(id) FROM device_events
+                   GROUP BY {_EVENT_DEDUP_KEY}
+               )"""
+        )
+        conn.execute(
+            f"CREATE UNIQUE INDEX idx_events_dedup ON device_events({_EVENT_DEDUP_KEY})"
+        )
+
+    def _has_text_event_timestamps(self, conn: sqlite3.Connection) -> bool:
+        """Check for a device_events table from before epoch timestamps."""
+        for column in conn.execute("PRAGMA table_info(device_events)"):
+            if column["name"] == "timestamp":
+                return column["type"] == "TEXT"
+        return False
+
+    def _migrate_event_timestamps(self, conn: sqlite3.Connection) -> None:
+        """Rebuild device_events with INTEGER epoch-microsecond timestamps.
+
+        The old table is renamed, the schema recreated, and rows copied over
+        with their ISO timestamps converted, all in one transaction.
+        """
+        conn.executescript(
+            """
+            BEGIN IMMEDIATE;
+            ALTER TABLE device_events RENAME TO device_events_legacy;
+            DROP INDEX IF EXISTS idx_events_entity_timestamp;
+            DROP INDEX IF EXISTS idx_events_timestamp;
+            DROP INDEX IF EXISTS idx_events_domain;
+            """
+            + self._get_schema_sql()
+        )
+        try:
+            rows = conn.execute(
+                """SELECT id, entity_id, domain, old_state, new_state, timestamp,
+                          source, context_user_id, context_parent_id,
+                          attributes_json, created_at
+                   FROM device_events_legacy"""
+            ).fetchall()
+            conn.executemany(
+                """INSERT INTO device_events
+                   (id, entity_id, domain, old_state, new_state, timestamp,
+                    source, context_user_id, context_parent_id,
+                    attributes_json, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                (
+                    (
+                        *row[:5],
+                        _to_epoch_us(datetime.fromisoformat(row[5])),
+                        *row[6:],
+                    )
+                    for row in rows
+                ),
+            )
+            conn.execute("DROP TABLE device_events_legacy")
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def reset(self) -> None:
+        """Delete all stored data while keeping the schema."""
+        with self.transaction() as conn:
+            for table in (
+                "user_preferences",
+                "detected_patterns",
+                "device_events",
+                "sync_metadata",
+            ):
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("DELETE FROM sqlite_sequence")
+            conn.execute("INSERT OR IGNORE INTO sync_metadata (id) VALUES (1)")
+
     def _get_schema_sql(self) -> str:
         """Return the full database schema SQL."""
         return """
@@ -55,7 +239,7 @@ class PatternDatabase:
             domain TEXT NOT NULL,
             old_state TEXT,
             new_state TEXT NOT NULL,
-            timestamp TEXT NOT NULL,
+            timestamp INTEGER NOT NULL,  -- microseconds since the Unix epoch (UTC)
             source TEXT NOT NULL,
             context_user_id TEXT,
             context_parent_id TEXT,
@@ -121,56 +305,71 @@ class PatternDatabase:
     # ==================== Event Operations ====================
 
     def insert_event(self, event: DeviceEvent) -> int:
-        """Insert a device event and return its ID."""
+        """Insert a device event and return its ID.
+
+        If an event with the same key is already stored, that event's ID is returned.
+        """
+        sql = """INSERT OR IGNORE INTO device_events
+                 (entity_id, domain, old_state, new_state, timestamp, source,
+                  context_user_id, context_parent_id, attributes_json)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+        params = (
+            event.entity_id,
+            event.domain,
+            event.old_state,
+            event.new_state,
+            _to_epoch_us(event.timestamp),
+            event.source.value,
+            event.context_user_id,
+            event.context_parent_id,
+            _dump_attributes(event.attributes),
+        )
         with self._get_connection() as conn:
-            cursor = conn.execute(
-                """INSERT INTO device_events
-                   (entity_id, domain, old_state, new_state, timestamp, source,
-                    context_user_id, context_parent_id, attributes_json)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    event.entity_id,
-                    event.domain,
-                    event.old_state,
-                    event.new_state,
-                    event.timestamp.isoformat(),
-                    event.source.value,
-                    event.context_user_id,
-                    event.context_parent_id,
-                    json.dumps(event.attributes),
-                ),
-            )
+            if _HAS_RETURNING:
+                row = conn.execute(sql + " RETURNING id", params).fetchone()
+                event_id = row[0] if row else None
+            else:
+                cursor = conn.execute(sql, params)
+                event_id = cursor.lastrowid if cursor.rowcount else None
+            if event_id is None:
+                event_id = conn.execute(
+                    """SELECT id FROM device_events WHERE entity_id = ?
+                       AND timestamp / 1000000 = ? / 1000000 AND new_state = ?""",
+                    (event.entity_id, params[4], event.new_state),
+                ).fetchone()[0]
             conn.commit()
-            return cursor.lastrowid
+            return event_id
 
     def insert_events_batch(self, events: list[DeviceEvent]) -> int:
-        """Insert multiple events efficiently. Returns count inserted."""
+        """Insert multiple events efficiently, skipping ones already stored.
+
+        Returns the number of new rows.
+        """
         if not events:
             return 0
 
-        with self._get_connection() as conn:
-            conn.executemany(
-                """INSERT INTO device_events
+        with self.transaction() as conn:
+            cursor = conn.executemany(
+                """INSERT OR IGNORE INTO device_events
                    (entity_id, domain, old_state, new_state, timestamp, source,
                     context_user_id, context_parent_id, attributes_json)
                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                [
+                (
                     (
                         e.entity_id,
                         e.domain,
                         e.old_state,
                         e.new_state,
-                        e.timestamp.isoformat(),
+                        _to_epoch_us(e.timestamp),
                         e.source.value,
                         e.context_user_id,
                         e.context_parent_id,
-                        json.dumps(e.attributes),
+                        _dump_attributes(e.attributes),
                     )
                     for e in events
-                ],
+                ),
             )
-            conn.commit()
-            return len(events)
+        return cursor.rowcount
 
     def get_events_in_range(
         self,
@@ -180,8 +379,12 @@ class PatternDatabase:
         domain: Optional[str] = None,
     ) -> list[DeviceEvent]:
         """Get events within a time range."""
-        query = "SELECT * FROM device_events WHERE timestamp BETWEEN ? AND ?"
-        params: list = [start.isoformat(), end.isoformat()]
+        query = (
+            "SELECT id, entity_id, domain, old_state, new_state, timestamp,"
+            " source, context_user_id, context_parent_id, attributes_json"
+            " FROM device_events WHERE timestamp BETWEEN ? AND ?"
+        )
+        params: list = [_to_epoch_us(start), _to_epoch_us(end)]
 
         if entity_id:
             query += " AND entity_id = ?"
@@ -193,8 +396,11 @@ class PatternDatabase:
         query += " ORDER BY timestamp ASC"
 
         with self._get_connection() as conn:
-            rows = conn.execute(query, params).fetchall()
-            return [self._row_to_event(row) for row in rows]
+            # Plain tuples unpack faster than sqlite3.Row for large ranges
+            cursor = conn.cursor()
+            cursor.row_factory = None
+            cursor.execute(query, params)
+            return [self._row_to_event(row) for row in cursor]
 
     def get_event_count(self) -> int:
         """Get total number of events."""
@@ -202,21 +408,34 @@ class PatternDatabase:
             result = conn.execute("SELECT COUNT(*) FROM device_events").fetchone()
             return result[0] if result else 0
 
-    def _row_to_event(self, row: sqlite3.Row) -> DeviceEvent:
-        """Convert a database row to DeviceEvent."""
-        return DeviceEvent(
-            id=row["id"],
-            entity_id=row["entity_id"],
-            domain=row["domain"],
-            old_state=row["old_state"],
-            new_state=row["new_state"],
-            timestamp=datetime.fromisoformat(row["timestamp"]),
-            source=EventSource(row["source"]),
-            context_user_id=row["context_user_id"],
-            context_parent_id=row["context_parent_id"],
-            attributes=json.loads(row["attributes_json"])
-            if row["attributes_json"]
-            else {},
+    def _row_to_event(self, row: tuple) -> DeviceEvent:
+        """Convert a device_events row tuple to DeviceEvent.
+
+        Rows come from our own schema, so Pydantic validation is skipped.
+        """
+        (
+            event_id,
+            entity_id,
+            domain,
+            old_state,
+            new_state,
+            timestamp,
+            source,
+            context_user_id,
+            context_parent_id,
+            attributes_json,
+        ) = row
+        return DeviceEvent.model_construct(
+            id=event_id,
+            entity_id=entity_id,
+            domain=domain,
+            old_state=old_state,
+            new_state=new_state,
+            timestamp=_from_epoch_us(timestamp),
+            source=EventSource(source),
+            context_user_id=context_user_id,
+            context_parent_id=context_parent_id,
+            attributes=orjson.loads(attributes_json) if attributes_json else {},
         )
 
     # ==================== Pattern Operations ====================
@@ -235,8 +454,8 @@ class PatternDatabase:
                     json.dumps(pattern.pattern_data),
                     pattern.confidence,
                     pattern.occurrence_count,
-                    pattern.first_seen.isoformat(),
-                    pattern.last_seen.isoformat(),
+                    pattern.first_seen,
+                    pattern.last_seen,
                 ),
             )
             conn.commit()
@@ -256,9 +475,9 @@ class PatternDatabase:
                 (
                     pattern.confidence,
                     pattern.occurrence_count,
-                    pattern.last_seen.isoformat(),
+                    pattern.last_seen,
                     json.dumps(pattern.pattern_data),
-                    datetime.utcnow().isoformat(),
+                    datetime.utcnow(),
                     pattern.id,
                 ),
             )
@@ -270,7 +489,7 @@ class PatternDatabase:
         """Get all active patterns above confidence threshold."""
         with self._get_connection() as conn:
             rows = conn.execute(
-                """SELECT * FROM detected_patterns
+                f"""SELECT {_PATTERN_COLUMNS} FROM detected_patterns
                    WHERE is_active = 1 AND confidence >= ?
                    ORDER BY confidence DESC, occurrence_count DESC""",
                 (min_confidence,),
@@ -281,7 +500,8 @@ class PatternDatabase:
         """Get a specific pattern by ID."""
         with self._get_connection() as conn:
             row = conn.execute(
-                "SELECT * FROM detected_patterns WHERE id = ?", (pattern_id,)
+                f"SELECT {_PATTERN_COLUMNS} FROM detected_patterns WHERE id = ?",
+                (pattern_id,),
             ).fetchone()
             return self._row_to_pattern(row) if row else None
 
@@ -290,7 +510,7 @@ class PatternDatabase:
         with self._get_connection() as conn:
             conn.execute(
                 "UPDATE detected_patterns SET is_active = 0, updated_at = ? WHERE id = ?",
-                (datetime.utcnow().isoformat(), pattern_id),
+                (datetime.utcnow(), pattern_id),
             )
             conn.commit()
 
@@ -303,8 +523,8 @@ class PatternDatabase:
             pattern_data=json.loads(row["pattern_data"]),
             confidence=row["confidence"],
             occurrence_count=row["occurrence_count"],
-            first_seen=datetime.fromisoformat(row["first_seen"]),
-            last_seen=datetime.fromisoformat(row["last_seen"]),
+            first_seen=row["first_seen"],
+            last_seen=row["last_seen"],
             is_active=bool(row["is_active"]),
             suggestion_generated=bool(row["suggestion_generated"]),
         )
@@ -343,11 +563,10 @@ class PatternDatabase:
         """Get the timestamp of last successful sync."""
         with self._get_connection() as conn:
             row = conn.execute(
-                "SELECT last_sync_timestamp FROM sync_metadata WHERE id = 1"
+                """SELECT last_sync_timestamp AS "last_sync_timestamp [timestamp]"
+                   FROM sync_metadata WHERE id = 1"""
             ).fetchone()
-            if row and row["last_sync_timestamp"]:
-                return datetime.fromisoformat(row["last_sync_timestamp"])
-            return None
+            return row["last_sync_timestamp"] if row else None
 
     def update_sync_metadata(
         self,
@@ -364,11 +583,11 @@ class PatternDatabase:
                    sync_duration_ms = ?, error_message = ?, updated_at = ?
                    WHERE id = 1""",
                 (
-                    timestamp.isoformat(),
+                    timestamp,
                     entity_count,
                     duration_ms,
                     error,
-                    datetime.utcnow().isoformat(),
+                    datetime.utcnow(),
                 ),
             )
             conn.commit()
@@ -381,7 +600,7 @@ class PatternDatabase:
         with self._get_connection() as conn:
             cursor = conn.execute(
                 "DELETE FROM device_events WHERE timestamp < ?",
-                (cutoff.isoformat(),),
+                (_to_epoch_us(cutoff),),
             )
             conn.commit()
             return cursor.rowcount
@@ -418,10 +637,10 @@ class PatternDatabase:
                     row["pattern_type"]: row["count"] for row in pattern_counts
                 },
                 "date_range": {
-                    "earliest": date_range[0],
-                    "latest": date_range[1],
+                    "earliest": _from_epoch_us(date_range[0]).isoformat(),
+                    "latest": _from_epoch_us(date_range[1]).isoformat(),
                 }
-                if date_range[0]
+                if date_range[0] is not None
                 else None,
             }
 
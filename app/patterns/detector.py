@@ -1,7 +1,7 @@
 """Pattern detection algorithms for device usage analysis."""
 
 import logging
-import statistics
+import math
 from collections import defaultdict
 from datetime import datetime, timedelta
 from typing import Optional
@@ -12,6 +12,20 @@ from app.patterns.models import DetectedPattern, DeviceEvent, PatternType
 logger = logging.getLogger(__name__)
 
 
+def _mean_stdev(values: list[float]) -> tuple[float, float]:
+    """Return the mean and sample standard deviation of ``values``.
+
+    Float arithmetic via ``math.fsum`` instead of the ``statistics`` module,
+    which computes exact fractions and is much slower on large samples.
+    """
+    n = len(values)
+    mean = math.fsum(values) / n
+    if n < 2:
+        return mean, 0.0
+    ss = math.fsum((x - mean) ** 2 for x in values)
+    return mean, math.sqrt(ss / (n - 1))
+
+
 class PatternDetector:
     """Detects usage patterns from device events."""
 
@@ -99,13 +113,18 @@ class PatternDetector:
         events: list[DeviceEvent],
     ) -> Optional[DetectedPattern]:
         """Analyze events for time-based patterns."""
-        # Extract time components: day_of_week -> list of minutes since midnight
+        # Extract time components: day_of_week -> list of minutes since midnight.
+        # First/last seen are tracked in the same pass.
         times_by_day: dict[int, list[int]] = defaultdict(list)
+        first_seen = last_seen = events[0].timestamp
 
         for event in events:
-            day_of_week = event.timestamp.weekday()
-            minutes = event.timestamp.hour * 60 + event.timestamp.minute
-            times_by_day[day_of_week].append(minutes)
+            ts = event.timestamp
+            times_by_day[ts.weekday()].append(ts.hour * 60 + ts.minute)
+            if ts < first_seen:
+                first_seen = ts
+            elif ts > last_seen:
+                last_seen = ts
 
         # Find days with consistent patterns (at least 2 occurrences on that day)
         consistent_days = []
@@ -113,20 +132,12 @@ class PatternDetector:
 
         for day, minutes_list in times_by_day.items():
             if len(minutes_list) >= 2:
-                try:
-                    avg = statistics.mean(minutes_list)
-                    stdev = (
-                        statistics.stdev(minutes_list)
-                        if len(minutes_list) > 1
-                        else 0
-                    )
-
-                    # If times are consistent within our window
-                    if stdev <= self.TIME_WINDOW_MINUTES:
-                        consistent_days.append(day)
-                        all_minutes.extend(minutes_list)
-                except statistics.StatisticsError:
-                    continue
+                _, stdev = _mean_stdev(minutes_list)
+
+                # If times are consistent within our window
+                if stdev <= self.TIME_WINDOW_MINUTES:
+                    consistent_days.append(day)
+                    all_minutes.extend(minutes_list)
 
         # Need enough occurrences across consistent days
         if (
@@ -136,13 +147,7 @@ class PatternDetector:
             return None
 
         # Calculate pattern statistics
-        try:
-            avg_minutes = statistics.mean(all_minutes)
-            variance = (
-                statistics.stdev(all_minutes) if len(all_minutes) > 1 else 0
-            )
-        except statistics.StatisticsError:
-            return None
+        avg_minutes, variance = _mean_stdev(all_minutes)
 
         avg_hour = int(avg_minutes // 60)
         avg_min = int(avg_minutes % 60)
@@ -181,8 +186,8 @@ class PatternDetector:
             pattern_data=pattern_data,
             confidence=round(confidence, 2),
             occurrence_count=len(all_minutes),
-            first_seen=min(e.timestamp for e in events),
-            last_seen=max(e.timestamp for e in events),
+            first_seen=first_seen,
+            last_seen=last_seen,
         )
 
     def _detect_sequential_patterns(
@@ -242,12 +247,11 @@ class PatternDetector:
             entity_a, state_a, entity_b, state_b = key
 
             try:
-                avg_delay = statistics.mean(delays)
+                avg_delay, delay_stdev = _mean_stdev(delays)
                 max_delay = max(delays)
 
                 # Calculate consistency of delays
                 if len(delays) > 1:
-                    delay_stdev = statistics.stdev(delays)
                     consistency = max(0.3, 1 - (delay_stdev / avg_delay))
                 else:
                     consistency = 0.5
@@ -257,7 +261,7 @@ class PatternDetector:
                 confidence = base_confidence * consistency
                 confidence = max(0.1, min(1.0, confidence))
 
-            except (statistics.StatisticsError, ZeroDivisionError):
+            except ZeroDivisionError:
                 continue
 
             pattern_data = {
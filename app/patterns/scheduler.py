@@ -4,6 +4,8 @@ import asyncio
 import logging
 from typing import Optional
 
+import httpx
+
 from app.patterns.collector import EventCollector
 from app.patterns.database import get_pattern_db
 from app.patterns.detector import get_pattern_detector
@@ -33,6 +35,8 @@ class PatternScheduler:
         self._detection_task: Optional[asyncio.Task] = None
         self._cleanup_task: Optional[asyncio.Task] = None
         self._running = False
+        # Connection pool reused across syncs; owned by the sync loop
+        self._client: Optional[httpx.AsyncClient] = None
 
     def start(self) -> None:
         """Start background tasks."""
@@ -61,21 +65,27 @@ class PatternScheduler:
 
     async def _sync_loop(self) -> None:
         """Periodically sync events from Home Assistant."""
-        # Initial sync immediately
-        await self._run_sync()
-
-        while self._running:
+        # The pool is closed when the loop ends, including on cancellation
+        async with httpx.AsyncClient(timeout=60.0) as client:
+            self._client = client
             try:
-                await asyncio.sleep(self.SYNC_INTERVAL_SECONDS)
-                if not self._running:
-                    break
+                # Initial sync immediately
                 await self._run_sync()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.exception(f"Sync loop error: {e}")
-                # Wait before retrying
-                await asyncio.sleep(60)
+
+                while self._running:
+                    try:
+                        await asyncio.sleep(self.SYNC_INTERVAL_SECONDS)
+                        if not self._running:
+                            break
+                        await self._run_sync()
+                    except asyncio.CancelledError:
+                        break
+                    except Exception as e:
+                        logger.exception(f"Sync loop error: {e}")
+                        # Wait before retrying
+                        await asyncio.sleep(60)
+            finally:
+                self._client = None
 
     async def _detection_loop(self) -> None:
         """Periodically run pattern detection."""
@@ -110,7 +120,7 @@ class PatternScheduler:
     async def _run_sync(self) -> tuple[int, Optional[str]]:
         """Execute a sync from Home Assistant history."""
         try:
-            collector = EventCollector(self.ha_url, self.ha_token)
+            collector = EventCollector(self.ha_url, self.ha_token, client=self._client)
             count, error = await collector.sync_from_history_api()
 
             if error:
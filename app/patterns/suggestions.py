@@ -24,6 +24,13 @@ class SuggestionGenerator:
     ]
     DAY_ABBREVS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
 
+    # Day sets with a shorter readable name
+    DAY_PRESETS = {
+        frozenset({0, 1, 2, 3, 4}): "weekdays",
+        frozenset({5, 6}): "weekends",
+        frozenset(range(7)): "every day",
+    }
+
     def __init__(self, entity_cache=None):
         self.db = get_pattern_db()
         self._entity_cache = entity_cache
@@ -85,16 +92,10 @@ class SuggestionGenerator:
         if not days:
             return "every day"
 
-        days_set = set(days)
-
-        if days_set == {0, 1, 2, 3, 4}:
-            return "weekdays"
-        elif days_set == {5, 6}:
-            return "weekends"
-        elif days_set == set(range(7)):
-            return "every day"
-        else:
-            return ", ".join(self.DAY_NAMES[d] for d in sorted(days))
+        preset = self.DAY_PRESETS.get(frozenset(days))
+        if preset:
+            return preset
+        return ", ".join(self.DAY_NAMES[d] for d in sorted(days))
 
     def _format_action(self, action: str) -> str:
         """Format action string for display."""
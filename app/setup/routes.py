@@ -103,7 +103,7 @@ async def save_config(request: SaveConfigRequest):
         from app.config import clear_settings_cache
         from app.main import clear_agent_cache
         clear_settings_cache()
-        clear_agent_cache()
+        await clear_agent_cache()
 
         return {"success": True, "message": "Configuration saved successfully"}
     except Exception as e:
@@ -141,7 +141,7 @@ async def save_limits(request: SaveLimitsRequest):
         from app.config import clear_settings_cache
         from app.main import clear_agent_cache
         clear_settings_cache()
-        clear_agent_cache()
+        await clear_agent_cache()
 
         return {"success": True, "message": "Limits updated successfully"}
     except Exception as e:
@@ -158,7 +158,7 @@ async def reset_config():
         from app.config import clear_settings_cache
         from app.main import clear_agent_cache
         clear_settings_cache()
-        clear_agent_cache()
+        await clear_agent_cache()
 
     return {
         "success": True,
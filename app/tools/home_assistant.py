@@ -1,20 +1,72 @@
 """Home Assistant API client and tools."""
+import asyncio
 import httpx
+import jiter
 import time
 from typing import Any
 from dataclasses import dataclass
 from app.config import get_settings
+from app.patterns.collector import EventCollector
 from app.usage import get_usage_tracker
 
 
-@dataclass
+# Resulting entity state for services whose outcome is known, used when
+# recording assistant events for pattern tracking. Other services record
+# the service name itself.
+_SERVICE_NEW_STATE = {
+    "turn_on": "on",
+    "turn_off": "off",
+    "lock": "locked",
+    "unlock": "unlocked",
+    "open_cover": "open",
+    "close_cover": "closed",
+}
+
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _on_background_done(task: asyncio.Task) -> None:
+    """Release a finished background task, swallowing its errors."""
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        # Best-effort bookkeeping: retrieve the exception so it isn't reported
+        task.exception()
+
+
+def _run_in_background(func, /, *args, **kwargs) -> asyncio.Task:
+    """Run a blocking call in a worker thread without awaiting it."""
+    task = asyncio.create_task(asyncio.to_thread(func, *args, **kwargs))
+    _background_tasks.add(task)
+    task.add_done_callback(_on_background_done)
+    return task
+
+
+def filter_domain(raw_states: list[dict], domain: str) -> list[dict]:
+    """Return the raw state dicts belonging to a single entity domain."""
+    prefix = domain + "."
+    return [d for d in raw_states if d["entity_id"].startswith(prefix)]
+
+
+@dataclass(slots=True, frozen=True)
 class HAState:
-    """Represents a Home Assistant entity state."""
+    """Represents a Home Assistant entity state (immutable, no per-instance dict)."""
     entity_id: str
     state: str
     attributes: dict
     last_changed: str | None = None
 
+    @classmethod
+    def from_raw(cls, data: dict) -> "HAState":
+        """Build from a raw /api/states item (positional args keep this cheap)."""
+        return cls(
+            data["entity_id"],
+            data["state"],
+            data.get("attributes") or {},
+            data.get("last_changed"),
+        )
+
 
 class HomeAssistantClient:
     """Client for interacting with Home Assistant API."""
@@ -27,80 +79,138 @@ class HomeAssistantClient:
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
         }
+        # Short-lived cache so the tool calls of a single agent turn share one
+        # /api/states fetch; the lock coalesces concurrent refreshes.
+        self._states_cache: tuple[float, list[dict]] | None = None
+        self._states_ttl = 1.5
+        self._states_lock = asyncio.Lock()
+        # Bumped on invalidation so a refresh already in flight doesn't store
+        # states fetched before the change
+        self._states_generation = 0
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Get the shared HTTP client (auth headers attached), creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(headers=self.headers, timeout=30.0)
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the shared HTTP client."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
 
     async def _request(self, method: str, endpoint: str, **kwargs) -> Any:
         """Make an HTTP request to Home Assistant."""
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         tracker = get_usage_tracker()
         request_data = kwargs.get("json")
 
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.request(
-                    method,
-                    f"{self.base_url}{endpoint}",
-                    headers=self.headers,
-                    timeout=30.0,
-                    **kwargs
-                )
-                response.raise_for_status()
-                response_data = response.json() if response.content else None
-                duration_ms = int((time.time() - start_time) * 1000)
-
-                # Log the request/response
-                tracker.record_ha_log(
-                    method=method,
-                    endpoint=endpoint,
-                    request_data=request_data,
-                    response_data=self._truncate_response(response_data),
-                    status_code=response.status_code,
-                    duration_ms=duration_ms
-                )
+        try:
+            response = await self._get_client().request(
+                method,
+                f"{self.base_url}{endpoint}",
+                **kwargs
+            )
+            response.raise_for_status()
+            # jiter parses the raw bytes ~2x faster than stdlib json on large
+            # /api/states payloads
+            response_data = jiter.from_json(response.content) if response.content else None
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
 
-                return response_data
-            except Exception as e:
-                duration_ms = int((time.time() - start_time) * 1000)
-                status_code = getattr(getattr(e, 'response', None), 'status_code', 0)
-                tracker.record_ha_log(
-                    method=method,
-                    endpoint=endpoint,
-                    request_data=request_data,
-                    response_data=None,
-                    status_code=status_code,
-                    duration_ms=duration_ms,
-                    error=str(e)
-                )
-                raise
+            # Log the request/response
+            tracker.record_ha_log(
+                method=method,
+                endpoint=endpoint,
+                request_data=request_data,
+                response_data=self._truncate_response(response_data),
+                status_code=response.status_code,
+                duration_ms=duration_ms
+            )
+
+            return response_data
+        except Exception as e:
+            duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
+            status_code = getattr(getattr(e, 'response', None), 'status_code', 0)
+            tracker.record_ha_log(
+                method=method,
+                endpoint=endpoint,
+                request_data=request_data,
+                response_data=None,
+                status_code=status_code,
+                duration_ms=duration_ms,
+                error=str(e)
+            )
+            raise
 
     def _truncate_response(self, data: Any, max_items: int = 10) -> Any:
-        """Truncate large responses for logging."""
-        if isinstance(data, list) and len(data) > max_items:
-            return data[:max_items] + [f"... and {len(data) - max_items} more items"]
+        """Truncate large responses for logging.
+
+        Top-level lists and list values of a top-level dict are cut to
+        max_items; payloads that are already small are returned untouched.
+        """
+        if isinstance(data, list):
+            if len(data) <= max_items:
+                return data
+            truncated = data[:max_items]
+            truncated.append(f"... and {len(data) - max_items} more items")
+            return truncated
+        if isinstance(data, dict) and any(
+            isinstance(v, list) and len(v) > max_items for v in data.values()
+        ):
+            return {
+                k: self._truncate_response(v, max_items) if isinstance(v, list) else v
+                for k, v in data.items()
+            }
         return data
     
+    def _cached_states(self) -> list[dict] | None:
+        """Return the cached raw states if they are still fresh."""
+        if self._states_cache is None:
+            return None
+        fetched_at, states = self._states_cache
+        if time.monotonic() - fetched_at < self._states_ttl:
+            return states
+        return None
+
+    def invalidate_states_cache(self) -> None:
+        """Drop cached states, e.g. after a call that changes them."""
+        self._states_cache = None
+        self._states_generation += 1
+
+    async def get_states_raw(self) -> list[dict]:
+        """Get all entity states as parsed JSON (cached for a short TTL).
+
+        Callers that only need a subset should filter these dicts before
+        building HAState objects; the returned list must not be mutated.
+        """
+        states = self._cached_states()
+        if states is not None:
+            return states
+
+        async with self._states_lock:
+            # Another caller may have refreshed while we waited for the lock
+            states = self._cached_states()
+            if states is not None:
+                return states
+
+            generation = self._states_generation
+            states = await self._request("GET", "/api/states")
+            if generation == self._states_generation:
+                self._states_cache = (time.monotonic(), states)
+            return states
+
     async def get_states(self) -> list[HAState]:
         """Get all entity states."""
-        data = await self._request("GET", "/api/states")
-        return [
-            HAState(
-                entity_id=item["entity_id"],
-                state=item["state"],
-                attributes=item.get("attributes", {}),
-                last_changed=item.get("last_changed")
-            )
-            for item in data
-        ]
+        data = await self.get_states_raw()
+        return [HAState.from_raw(item) for item in data]
     
     async def get_state(self, entity_id: str) -> HAState | None:
         """Get state for a specific entity."""
         try:
             data = await self._request("GET", f"/api/states/{entity_id}")
-            return HAState(
-                entity_id=data["entity_id"],
-                state=data["state"],
-                attributes=data.get("attributes", {}),
-                last_changed=data.get("last_changed")
-            )
+            return HAState.from_raw(data)
         except httpx.HTTPStatusError:
             return None
     
@@ -112,7 +222,8 @@ class HomeAssistantClient:
         **service_data
     ) -> dict:
         """Call a Home Assistant service."""
-        data = {**service_data}
+        # **service_data is already a fresh dict owned by this call, no copy needed
+        data = service_data
         if entity_id:
             data["entity_id"] = entity_id
         
@@ -121,6 +232,7 @@ class HomeAssistantClient:
             f"/api/services/{domain}/{service}",
             json=data
         )
+        self.invalidate_states_cache()
         return {"success": True, "result": result}
     
     async def create_automation(
@@ -147,149 +259,168 @@ class HomeAssistantClient:
             f"/api/config/automation/config/{automation_id}",
             json=data
         )
+        self.invalidate_states_cache()
         return {"success": True, "automation_id": automation_id}
     
     async def get_automations(self) -> list[HAState]:
         """Get all automations."""
-        states = await self.get_states()
-        return [s for s in states if s.entity_id.startswith("automation.")]
+        data = await self.get_states_raw()
+        return [HAState.from_raw(item) for item in filter_domain(data, "automation")]
 
 
-# Tool definitions for the AI agent
-class HomeAssistantTools:
-    """Tools that the AI agent can use."""
-    
-    def __init__(self):
-        self.client = HomeAssistantClient()
-    
-    def get_tool_definitions(self) -> list[dict]:
-        """Get tool definitions in OpenAI function format."""
-        return [
-            {
-                "type": "function",
-                "function": {
-                    "name": "get_entity_state",
-                    "description": "Get the current state of a Home Assistant entity. Use this BEFORE executing commands to check device availability and AFTER to verify commands worked.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "entity_id": {
-                                "type": "string",
-                                "description": "The entity ID (e.g., 'media_player.tv', 'light.living_room')"
-                            }
-                        },
-                        "required": ["entity_id"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "call_service",
-                    "description": "Call a Home Assistant service to control devices (turn on/off, play media, etc.)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "domain": {
-                                "type": "string",
-                                "description": "Service domain (e.g., 'light', 'media_player', 'switch', 'automation')"
-                            },
-                            "service": {
-                                "type": "string",
-                                "description": "Service name (e.g., 'turn_on', 'turn_off', 'play_media', 'toggle')"
-                            },
-                            "entity_id": {
-                                "type": "string",
-                                "description": "Target entity ID"
-                            },
-                            "service_data": {
-                                "type": "object",
-                                "description": "Additional service data (e.g., brightness, media_content_id)",
-                                "default": {}
-                            }
-                        },
-                        "required": ["domain", "service", "entity_id"]
+# Tool definitions for the AI agent (OpenAI function format), built once
+_TOOL_DEFINITIONS: list[dict] = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_entity_state",
+            "description": "Get the current state of a Home Assistant entity. Use this BEFORE executing commands to check device availability and AFTER to verify commands worked.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "entity_id": {
+                        "type": "string",
+                        "description": "The entity ID (e.g., 'media_player.tv', 'light.living_room')"
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_automations",
-                    "description": "List all automations in Home Assistant with their current state (enabled/disabled)",
-                    "parameters": {
+                },
+                "required": ["entity_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "call_service",
+            "description": "Call a Home Assistant service to control devices (turn on/off, play media, etc.)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "domain": {
+                        "type": "string",
+                        "description": "Service domain (e.g., 'light', 'media_player', 'switch', 'automation')"
+                    },
+                    "service": {
+                        "type": "string",
+                        "description": "Service name (e.g., 'turn_on', 'turn_off', 'play_media', 'toggle')"
+                    },
+                    "entity_id": {
+                        "type": "string",
+                        "description": "Target entity ID"
+                    },
+                    "service_data": {
                         "type": "object",
-                        "properties": {},
-                        "required": []
+                        "description": "Additional service data (e.g., brightness, media_content_id)",
+                        "default": {}
                     }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_automation",
-                    "description": "Create a new automation in Home Assistant",
-                    "parameters": {
+                },
+                "required": ["domain", "service", "entity_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_automations",
+            "description": "List all automations in Home Assistant with their current state (enabled/disabled)",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "create_automation",
+            "description": "Create a new automation in Home Assistant",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "automation_id": {
+                        "type": "string",
+                        "description": "Unique ID for the automation (lowercase, underscores, no spaces)"
+                    },
+                    "alias": {
+                        "type": "string",
+                        "description": "Human-readable name for the automation"
+                    },
+                    "trigger_type": {
+                        "type": "string",
+                        "enum": ["time", "state", "event"],
+                        "description": "Type of trigger"
+                    },
+                    "trigger_value": {
+                        "type": "string",
+                        "description": "Trigger value (e.g., '22:00:00' for time, entity_id for state)"
+                    },
+                    "action_domain": {
+                        "type": "string",
+                        "description": "Action service domain"
+                    },
+                    "action_service": {
+                        "type": "string",
+                        "description": "Action service name"
+                    },
+                    "action_entity_id": {
+                        "type": "string",
+                        "description": "Action target entity"
+                    },
+                    "action_data": {
                         "type": "object",
-                        "properties": {
-                            "automation_id": {
-                                "type": "string",
-                                "description": "Unique ID for the automation (lowercase, underscores, no spaces)"
-                            },
-                            "alias": {
-                                "type": "string",
-                                "description": "Human-readable name for the automation"
-                            },
-                            "trigger_type": {
-                                "type": "string",
-                                "enum": ["time", "state", "event"],
-                                "description": "Type of trigger"
-                            },
-                            "trigger_value": {
-                                "type": "string",
-                                "description": "Trigger value (e.g., '22:00:00' for time, entity_id for state)"
-                            },
-                            "action_domain": {
-                                "type": "string",
-                                "description": "Action service domain"
-                            },
-                            "action_service": {
-                                "type": "string",
-                                "description": "Action service name"
-                            },
-                            "action_entity_id": {
-                                "type": "string",
-                                "description": "Action target entity"
-                            },
-                            "action_data": {
-                                "type": "object",
-                                "description": "Additional action data",
-                                "default": {}
-                            }
-                        },
-                        "required": ["automation_id", "alias", "trigger_type", "trigger_value", 
-                                   "action_domain", "action_service", "action_entity_id"]
+                        "description": "Additional action data",
+                        "default": {}
                     }
-                }
-            },
-            {
-                "type": "function", 
-                "function": {
-                    "name": "list_entities",
-                    "description": "List all entities of a specific domain (e.g., all lights, all media players)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "domain": {
-                                "type": "string",
-                                "description": "Entity domain to list (e.g., 'light', 'media_player', 'switch')"
-                            }
-                        },
-                        "required": ["domain"]
+                },
+                "required": ["automation_id", "alias", "trigger_type", "trigger_value", 
+                           "action_domain", "action_service", "action_entity_id"]
+            }
+        }
+    },
+    {
+        "type": "function", 
+        "function": {
+            "name": "list_entities",
+            "description": "List all entities of a specific domain (e.g., all lights, all media players)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "domain": {
+                        "type": "string",
+                        "description": "Entity domain to list (e.g., 'light', 'media_player', 'switch')"
                     }
-                }
+                },
+                "required": ["domain"]
             }
-        ]
+        }
+    }
+]
+
+
+class HomeAssistantTools:
+    """Tools that the AI agent can use."""
+    
+    def __init__(self):
+        self.client = HomeAssistantClient()
+        # Created on first use: opening the pattern database may migrate it
+        self.collector: EventCollector | None = None
+
+    async def aclose(self) -> None:
+        """Close the Home Assistant client."""
+        await self.client.aclose()
+
+    def _record_assistant_event(self, **kwargs) -> None:
+        """Record a pattern-tracking event, creating the collector on first use."""
+        if self.collector is None:
+            self.collector = EventCollector(self.client.base_url, self.client.token)
+        self.collector.record_assistant_event(**kwargs)
+
+    def get_tool_definitions(self) -> list[dict]:
+        """Get tool definitions in OpenAI function format.
+
+        Returns the shared module-level list; callers must not mutate it.
+        """
+        return _TOOL_DEFINITIONS
     
     async def execute_tool(self, tool_name: str, arguments: dict) -> str:
         """Execute a tool and return the result as a string."""
@@ -304,49 +435,48 @@ class HomeAssistantTools:
                 entity_id = arguments.get("entity_id")
                 service_data = arguments.get("service_data", {})
 
-                # Get current state before the call for pattern tracking
+                # Fetch the current state for pattern tracking alongside the
+                # service call rather than before it. It is only used for
+                # best-effort bookkeeping, so a read that races the call is fine.
+                old_state_task = (
+                    asyncio.create_task(self.client.get_state(entity_id))
+                    if entity_id
+                    else None
+                )
+
+                try:
+                    result = await self.client.call_service(
+                        domain=arguments["domain"],
+                        service=arguments["service"],
+                        entity_id=entity_id,
+                        **service_data
+                    )
+                except Exception:
+                    if old_state_task:
+                        old_state_task.cancel()
+                    raise
+
                 old_state = None
-                if entity_id:
+                if old_state_task:
                     try:
-                        current = await self.client.get_state(entity_id)
+                        current = await old_state_task
                         old_state = current.state if current else None
                     except Exception:
                         pass
 
-                result = await self.client.call_service(
-                    domain=arguments["domain"],
-                    service=arguments["service"],
-                    entity_id=entity_id,
-                    **service_data
-                )
-
                 # Record event for pattern tracking
                 if entity_id:
                     try:
-                        from app.patterns.collector import EventCollector
-                        from app.config import get_settings
-
-                        settings = get_settings()
-                        collector = EventCollector(settings.ha_url, settings.ha_token)
-
-                        # Determine new state based on service
+                        # Determine new state based on service (accepts "light.turn_on" too)
                         service = arguments["service"]
-                        if "turn_on" in service:
-                            new_state = "on"
-                        elif "turn_off" in service:
-                            new_state = "off"
-                        elif service in ("lock",):
-                            new_state = "locked"
-                        elif service in ("unlock",):
-                            new_state = "unlocked"
-                        elif service in ("open_cover",):
-                            new_state = "open"
-                        elif service in ("close_cover",):
-                            new_state = "closed"
-                        else:
-                            new_state = service
-
-                        collector.record_assistant_event(
+                        new_state = _SERVICE_NEW_STATE.get(
+                            service.rpartition(".")[2], service
+                        )
+
+                        # Write in the background so the reply isn't held up by
+                        # SQLite; failures there are dropped with the task
+                        _run_in_background(
+                            self._record_assistant_event,
                             entity_id=entity_id,
                             old_state=old_state,
                             new_state=new_state,
@@ -394,15 +524,15 @@ class HomeAssistantTools:
                 return f"Automation '{arguments['alias']}' created successfully"
             
             elif tool_name == "list_entities":
-                states = await self.client.get_states()
                 domain = arguments["domain"]
-                entities = [s for s in states if s.entity_id.startswith(f"{domain}.")]
+                entities = filter_domain(await self.client.get_states_raw(), domain)
                 if not entities:
                     return f"No {domain} entities found"
                 lines = [f"{domain.title()} entities:"]
                 for e in entities:
-                    name = e.attributes.get("friendly_name", e.entity_id)
-                    lines.append(f"- {e.entity_id}: {e.state} ({name})")
+                    entity_id = e["entity_id"]
+                    name = (e.get("attributes") or {}).get("friendly_name", entity_id)
+                    lines.append(f"- {entity_id}: {e['state']} ({name})")
                 return "\n".join(lines)
             
             else:
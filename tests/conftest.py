@@ -0,0 +1,67 @@
+"""Shared pytest configuration for the test suite.
+
+Test classes are independent (each builds its own in-memory database), so
+the suite can run in parallel with pytest-xdist:
+
+    pytest -n auto --dist loadfile
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+
+# Set at import time, before pytest imports any test module (and through it
+# the app settings), so every xdist worker process gets them too
+os.environ.setdefault("HA_URL", "http://localhost:8123")
+os.environ.setdefault("HA_TOKEN", "test_token")
+
+# Fixed "current" time for tests whose code under test doesn't read the clock
+NOW = datetime(2024, 1, 15, 18, 30, 0)
+
+# Warm imports: build the pattern package's Pydantic models once per session
+# instead of during whichever test module happens to be collected first
+from app.patterns import collector, database, detector, models, suggestions  # noqa: E402,F401
+
+# Validate one instance of each pattern model up front so first-use costs
+# land here rather than in the timing of whichever test runs first. The
+# schemas themselves are already built when the classes are defined.
+models.DeviceEvent(
+    entity_id="light.warmup",
+    domain="light",
+    new_state="on",
+    timestamp=NOW,
+    attributes={"brightness": 255},
+)
+models.DetectedPattern(
+    pattern_type=models.PatternType.TIME_BASED,
+    entity_ids=["light.warmup"],
+    pattern_data={},
+    confidence=0.5,
+    first_seen=NOW,
+    last_seen=NOW,
+)
+models.PatternSuggestion(
+    pattern_id=1,
+    pattern_type=models.PatternType.TIME_BASED,
+    title="",
+    description="",
+    command="",
+    confidence=0.5,
+    occurrence_count=1,
+    entities_involved=["light.warmup"],
+)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def pattern_db():
+    """Back the global pattern database with an in-memory one for the session.
+
+    Code under test that calls get_pattern_db() (detector, suggestions, the
+    scheduler) then never touches data/usage_patterns.db, which parallel
+    xdist workers would otherwise all open at once.
+    """
+    previous = database._pattern_db
+    database._pattern_db = database.PatternDatabase(database.PatternDatabase.MEMORY_PATH)
+    yield database._pattern_db
+    database._pattern_db = previous
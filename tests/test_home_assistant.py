@@ -0,0 +1,241 @@
+"""Tests for the Home Assistant API client and tools."""
+
+import asyncio
+import sqlite3
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+
+from app import main
+from app.tools import home_assistant
+from app.tools.home_assistant import HomeAssistantClient, HomeAssistantTools, filter_domain
+
+RAW_STATES = [
+    {"entity_id": "light.kitchen", "state": "on", "attributes": {"friendly_name": "Kitchen"}},
+    {"entity_id": "light.hallway", "state": "off", "attributes": {}},
+    {"entity_id": "automation.night", "state": "on", "attributes": {}},
+    {"entity_id": "sensor.temperature", "state": "21.5", "attributes": {}},
+]
+
+
+class TestRequest(unittest.IsolatedAsyncioTestCase):
+    """Tests for HomeAssistantClient._request over a mocked transport."""
+
+    async def test_request_uses_shared_client(self):
+        """Requests carry the auth header and parse the JSON body."""
+        seen = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            seen.append(request)
+            return httpx.Response(200, json=RAW_STATES)
+
+        client = HomeAssistantClient()
+        client._client = httpx.AsyncClient(
+            headers=client.headers, transport=httpx.MockTransport(handler)
+        )
+        shared = client._get_client()
+
+        states = await client.get_states()
+        await client.call_service("light", "turn_on", entity_id="light.kitchen")
+
+        self.assertIs(client._get_client(), shared)
+        self.assertEqual(len(states), 4)
+        self.assertEqual(states[0].attributes, {"friendly_name": "Kitchen"})
+        self.assertEqual(seen[0].url.path, "/api/states")
+        self.assertEqual(seen[0].headers["Authorization"], f"Bearer {client.token}")
+
+        await client.aclose()
+        self.assertIsNone(client._client)
+
+    def test_truncate_response(self):
+        """Large lists are truncated for logging, small payloads untouched."""
+        client = HomeAssistantClient()
+        small = {"state": "on", "attributes": {}}
+        self.assertIs(client._truncate_response(small), small)
+        self.assertIs(client._truncate_response(RAW_STATES), RAW_STATES)
+
+        truncated = client._truncate_response(list(range(25)))
+        self.assertEqual(truncated[:10], list(range(10)))
+        self.assertEqual(truncated[10], "... and 15 more items")
+
+        nested = client._truncate_response({"entity_id": "x", "items": list(range(12))})
+        self.assertEqual(nested["entity_id"], "x")
+        self.assertEqual(len(nested["items"]), 11)
+
+
+class TestStatesCache(unittest.IsolatedAsyncioTestCase):
+    """Tests for the short-lived get_states() cache."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.request = AsyncMock(return_value=RAW_STATES)
+
+    def setUp(self):
+        self.request.reset_mock()
+        self.client = HomeAssistantClient()
+        self.client._request = self.request
+
+    async def test_repeated_calls_hit_cache(self):
+        """Calls within the TTL reuse one /api/states fetch."""
+        first = await self.client.get_states_raw()
+        second = await self.client.get_states_raw()
+        states = await self.client.get_states()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(states), 4)
+        self.client._request.assert_awaited_once_with("GET", "/api/states")
+
+    async def test_concurrent_calls_coalesce(self):
+        """Concurrent callers share a single in-flight request."""
+        results = await asyncio.gather(*(self.client.get_states_raw() for _ in range(5)))
+
+        self.assertEqual(self.client._request.await_count, 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    async def test_expired_cache_refetches(self):
+        """A stale cache entry triggers a new fetch."""
+        self.client._states_ttl = 0
+        await self.client.get_states()
+        await self.client.get_states()
+
+        self.assertEqual(self.client._request.await_count, 2)
+
+    async def test_call_service_invalidates_cache(self):
+        """Service calls drop cached states."""
+        await self.client.get_states()
+        await self.client.call_service("light", "turn_on", entity_id="light.kitchen")
+
+        self.assertIsNone(self.client._states_cache)
+
+    async def test_invalidation_during_refresh(self):
+        """A refresh that was in flight when the cache was invalidated isn't stored."""
+        release = asyncio.Event()
+
+        async def slow_request(method, endpoint, **kwargs):
+            await release.wait()
+            return RAW_STATES
+
+        self.client._request = slow_request
+        refresh = asyncio.create_task(self.client.get_states_raw())
+        await asyncio.sleep(0)
+        self.client.invalidate_states_cache()
+        release.set()
+
+        self.assertIs(await refresh, RAW_STATES)
+        self.assertIsNone(self.client._states_cache)
+
+
+class TestDomainFiltering(unittest.IsolatedAsyncioTestCase):
+    """Tests for domain-filtered entity listing."""
+
+    def test_filter_domain(self):
+        """Only entities of the requested domain are returned."""
+        lights = filter_domain(RAW_STATES, "light")
+        self.assertEqual(
+            [d["entity_id"] for d in lights], ["light.kitchen", "light.hallway"]
+        )
+        self.assertEqual(filter_domain(RAW_STATES, "lig"), [])
+
+    async def test_list_entities_tool(self):
+        """list_entities formats matching entities from the raw states."""
+        tools = HomeAssistantTools()
+        tools.client._request = AsyncMock(return_value=RAW_STATES)
+
+        result = await tools.execute_tool("list_entities", {"domain": "light"})
+
+        self.assertIn("- light.kitchen: on (Kitchen)", result)
+        self.assertIn("- light.hallway: off (light.hallway)", result)
+        self.assertNotIn("sensor.temperature", result)
+
+    async def test_get_automations(self):
+        """Only automation entities are materialized as HAState."""
+        client = HomeAssistantClient()
+        client._request = AsyncMock(return_value=RAW_STATES)
+
+        automations = await client.get_automations()
+
+        self.assertEqual([a.entity_id for a in automations], ["automation.night"])
+        self.assertEqual(automations[0].state, "on")
+
+
+class TestCallServiceTool(unittest.IsolatedAsyncioTestCase):
+    """Tests for the call_service tool and its pattern tracking."""
+
+    async def test_records_assistant_event(self):
+        """A successful service call records the derived new state."""
+        tools = HomeAssistantTools()
+        tools.client._request = AsyncMock(
+            return_value={"entity_id": "light.kitchen", "state": "off", "attributes": {}}
+        )
+        collector = tools.collector = MagicMock()
+
+        result = await tools.execute_tool(
+            "call_service",
+            {"domain": "light", "service": "turn_on", "entity_id": "light.kitchen"},
+        )
+        await asyncio.gather(*home_assistant._background_tasks)
+
+        self.assertEqual(result, "Service light.turn_on called successfully")
+        collector.record_assistant_event.assert_called_once_with(
+            entity_id="light.kitchen",
+            old_state="off",
+            new_state="on",
+            attributes={},
+        )
+
+    async def test_pattern_db_failure_does_not_fail_call(self):
+        """A broken pattern database neither blocks building the tools nor the call."""
+        with patch(
+            "app.patterns.collector.get_pattern_db",
+            side_effect=sqlite3.OperationalError("database is locked"),
+        ):
+            tools = HomeAssistantTools()
+            tools.client._request = AsyncMock(return_value={"state": "on"})
+
+            result = await tools.execute_tool(
+                "call_service",
+                {"domain": "light", "service": "turn_on", "entity_id": "light.kitchen"},
+            )
+            await asyncio.gather(*home_assistant._background_tasks, return_exceptions=True)
+
+        self.assertEqual(result, "Service light.turn_on called successfully")
+        self.assertIsNone(tools.collector)
+
+
+class TestClientLifecycle(unittest.IsolatedAsyncioTestCase):
+    """Tests for closing the pooled HTTP clients."""
+
+    async def test_tools_aclose(self):
+        """Closing the tools closes the client's connection pool."""
+        tools = HomeAssistantTools()
+        pool = tools.client._get_client()
+
+        await tools.aclose()
+
+        self.assertTrue(pool.is_closed)
+        self.assertIsNone(tools.client._client)
+
+    async def test_clear_agent_cache_closes_agent(self):
+        """Dropping the cached agent closes its clients."""
+        agent = MagicMock(aclose=AsyncMock())
+        main._agent = agent
+
+        await main.clear_agent_cache()
+
+        self.assertIsNone(main._agent)
+        agent.aclose.assert_awaited_once()
+
+    async def test_shutdown_survives_close_failure(self):
+        """The scheduler is still stopped if closing the agent's clients fails."""
+        with patch.object(main, "is_configured", return_value=False), patch.object(
+            main, "clear_agent_cache", AsyncMock(side_effect=RuntimeError("boom"))
+        ), patch("app.patterns.scheduler.stop_pattern_scheduler") as stop:
+            async with main.lifespan(main.app):
+                pass
+
+        stop.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,18 +2,82 @@
 
 import asyncio
 import json
-import os
+import shutil
+import sqlite3
+import statistics
 import tempfile
 import unittest
 from datetime import datetime, timedelta
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
-import pytest
+import httpx
+from conftest import NOW
+
+from app.main import get_pattern_insights
+from app.patterns.collector import EventCollector
+from app.patterns.database import PatternDatabase, _to_epoch_us
+from app.patterns.detector import PatternDetector, _mean_stdev
+from app.patterns.models import (
+    DetectedPattern,
+    DeviceEvent,
+    EventSource,
+    PatternSuggestion,
+    PatternType,
+)
+from app.patterns.scheduler import (
+    PatternScheduler,
+    get_pattern_scheduler,
+    init_pattern_scheduler,
+    stop_pattern_scheduler,
+)
+from app.patterns.suggestions import SuggestionGenerator
+
+
+def _make_history(entity_ids, last_changed="2024-01-15T10:00:00+00:00"):
+    """Build a History API response with one "on" state per entity."""
+    return [
+        [
+            {
+                "entity_id": entity_id,
+                "state": "on",
+                "last_changed": last_changed,
+                "context": {},
+                "attributes": {},
+            }
+        ]
+        for entity_id in entity_ids
+    ]
+
 
-# Set up test environment before imports
-os.environ.setdefault("HA_URL", "http://localhost:8123")
-os.environ.setdefault("HA_TOKEN", "test_token")
+class DatabaseTestCase(unittest.TestCase):
+    """Shares one in-memory test database per TestCase class, emptied before each test."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Create the class-wide test database."""
+        cls.db = PatternDatabase(PatternDatabase.MEMORY_PATH)
+
+    def setUp(self):
+        """Start each test from an empty database."""
+        self.db.reset()
+
+    def _get_test_db(self):
+        """Get the shared test database instance."""
+        return self.db
+
+    def _seed_events(self, rows):
+        """Bulk-insert raw (entity_id, domain, old_state, new_state, timestamp, source) rows."""
+        with self.db.transaction() as conn:
+            conn.executemany(
+                """INSERT INTO device_events
+                   (entity_id, domain, old_state, new_state, timestamp, source)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (
+                    (entity_id, domain, old, new, _to_epoch_us(ts), source)
+                    for entity_id, domain, old, new, ts, source in rows
+                ),
+            )
 
 
 class TestPatternModels(unittest.TestCase):
@@ -21,14 +85,12 @@ class TestPatternModels(unittest.TestCase):
 
     def test_device_event_creation(self):
         """Test DeviceEvent model creation."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         event = DeviceEvent(
             entity_id="light.living_room",
             domain="light",
             old_state="off",
             new_state="on",
-            timestamp=datetime.utcnow(),
+            timestamp=NOW,
             source=EventSource.ASSISTANT,
         )
 
@@ -40,13 +102,11 @@ class TestPatternModels(unittest.TestCase):
 
     def test_device_event_with_attributes(self):
         """Test DeviceEvent with attributes."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         event = DeviceEvent(
             entity_id="light.bedroom",
             domain="light",
             new_state="on",
-            timestamp=datetime.utcnow(),
+            timestamp=NOW,
             source=EventSource.EXTERNAL,
             attributes={"brightness": 255, "color_temp": 370},
         )
@@ -56,8 +116,6 @@ class TestPatternModels(unittest.TestCase):
 
     def test_detected_pattern_creation(self):
         """Test DetectedPattern model creation."""
-        from app.patterns.models import DetectedPattern, PatternType
-
         pattern = DetectedPattern(
             pattern_type=PatternType.TIME_BASED,
             entity_ids=["light.living_room"],
@@ -71,8 +129,8 @@ class TestPatternModels(unittest.TestCase):
             },
             confidence=0.75,
             occurrence_count=5,
-            first_seen=datetime.utcnow() - timedelta(days=7),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW - timedelta(days=7),
+            last_seen=NOW,
         )
 
         self.assertEqual(pattern.pattern_type, PatternType.TIME_BASED)
@@ -82,8 +140,6 @@ class TestPatternModels(unittest.TestCase):
 
     def test_pattern_suggestion_creation(self):
         """Test PatternSuggestion model creation."""
-        from app.patterns.models import PatternSuggestion, PatternType
-
         suggestion = PatternSuggestion(
             pattern_id=1,
             pattern_type=PatternType.TIME_BASED,
@@ -105,8 +161,6 @@ class TestPatternModels(unittest.TestCase):
 
     def test_event_source_enum(self):
         """Test EventSource enum values."""
-        from app.patterns.models import EventSource
-
         self.assertEqual(EventSource.ASSISTANT.value, "assistant")
         self.assertEqual(EventSource.EXTERNAL.value, "external")
         self.assertEqual(EventSource.AUTOMATION.value, "automation")
@@ -114,35 +168,27 @@ class TestPatternModels(unittest.TestCase):
 
     def test_pattern_type_enum(self):
         """Test PatternType enum values."""
-        from app.patterns.models import PatternType
-
         self.assertEqual(PatternType.TIME_BASED.value, "time_based")
         self.assertEqual(PatternType.SEQUENTIAL.value, "sequential")
 
 
-class TestPatternDatabase(unittest.TestCase):
+class TestPatternDatabase(DatabaseTestCase):
     """Tests for pattern database operations."""
 
-    def setUp(self):
-        """Set up test database."""
-        # Create a temporary directory for the test database
-        self.temp_dir = tempfile.mkdtemp()
-        self.original_db_dir = None
-
-    def tearDown(self):
-        """Clean up test database."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # For the few tests that need an on-disk database; each uses its own file
+        cls.temp_dir = tempfile.mkdtemp()
 
-    def _get_test_db(self):
-        """Get a test database instance."""
-        from app.patterns.database import PatternDatabase
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+        super().tearDownClass()
 
-        db = PatternDatabase()
-        # Override the database path for testing
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-        return db
+    def _disk_db_path(self) -> Path:
+        """Path to a database file unique to the current test."""
+        return Path(self.temp_dir) / f"{self._testMethodName}.db"
 
     def test_database_initialization(self):
         """Test database schema creation."""
@@ -160,10 +206,30 @@ class TestPatternDatabase(unittest.TestCase):
         self.assertIn("user_preferences", tables)
         self.assertIn("sync_metadata", tables)
 
+    def test_connection_pragmas(self):
+        """Test WAL journal mode and relaxed sync on an on-disk database."""
+        db = PatternDatabase(self._disk_db_path())
+
+        with db._get_connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+
+        self.assertEqual(journal_mode, "wal")
+        self.assertEqual(synchronous, 1)  # NORMAL
+
+    def test_memory_database_shares_connection(self):
+        """Test that an in-memory database keeps its data across operations."""
+        db = self._get_test_db()
+
+        with db._get_connection() as first, db._get_connection() as second:
+            self.assertIs(first, second)
+            # Nothing is journaled to or synced with disk
+            journal_mode = first.execute("PRAGMA journal_mode").fetchone()[0]
+
+        self.assertEqual(journal_mode, "memory")
+
     def test_insert_and_retrieve_event(self):
         """Test inserting and retrieving events."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         db = self._get_test_db()
 
         event = DeviceEvent(
@@ -171,7 +237,7 @@ class TestPatternDatabase(unittest.TestCase):
             domain="light",
             old_state="off",
             new_state="on",
-            timestamp=datetime.utcnow(),
+            timestamp=NOW,
             source=EventSource.ASSISTANT,
         )
 
@@ -181,26 +247,122 @@ class TestPatternDatabase(unittest.TestCase):
 
         # Retrieve events
         events = db.get_events_in_range(
-            datetime.utcnow() - timedelta(hours=1),
-            datetime.utcnow() + timedelta(hours=1),
+            NOW - timedelta(hours=1),
+            NOW + timedelta(hours=1),
         )
 
         self.assertEqual(len(events), 1)
         self.assertEqual(events[0].entity_id, "light.kitchen")
         self.assertEqual(events[0].new_state, "on")
 
+    def test_insert_event_returns_id(self):
+        """Test that insert_event returns the new row ID with and without RETURNING."""
+        db = self._get_test_db()
+
+        def make_event(minutes):
+            return DeviceEvent(
+                entity_id="light.kitchen",
+                domain="light",
+                new_state="on",
+                timestamp=NOW - timedelta(minutes=minutes),
+                source=EventSource.ASSISTANT,
+            )
+
+        first_id = db.insert_event(make_event(2))
+        with patch("app.patterns.database._HAS_RETURNING", False):
+            second_id = db.insert_event(make_event(1))
+
+        self.assertEqual(second_id, first_id + 1)
+        self.assertEqual(db.get_event_count(), 2)
+
+    def test_event_timestamp_round_trip(self):
+        """Test that timestamps are stored as epoch microseconds and read back exactly."""
+        db = self._get_test_db()
+        timestamp = datetime(2024, 1, 15, 18, 30, 0, 123456)
+        db.insert_event(
+            DeviceEvent(
+                entity_id="light.kitchen",
+                domain="light",
+                new_state="on",
+                timestamp=timestamp,
+                source=EventSource.EXTERNAL,
+                attributes={"brightness": 255, "color_temp": 370},
+            )
+        )
+
+        with db._get_connection() as conn:
+            stored = conn.execute("SELECT timestamp FROM device_events").fetchone()[0]
+        events = db.get_events_in_range(timestamp, timestamp)
+
+        self.assertEqual(stored, 1705343400123456)
+        self.assertEqual(events[0].timestamp, timestamp)
+        self.assertEqual(events[0].attributes, {"brightness": 255, "color_temp": 370})
+
+    def test_migrate_text_timestamps(self):
+        """Test that a database with ISO text timestamps is migrated on open."""
+        db_path = self._disk_db_path()
+
+        conn = sqlite3.connect(db_path)
+        conn.executescript(
+            """
+            CREATE TABLE device_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                entity_id TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                old_state TEXT,
+                new_state TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                source TEXT NOT NULL,
+                context_user_id TEXT,
+                context_parent_id TEXT,
+                attributes_json TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX idx_events_timestamp ON device_events(timestamp);
+            """
+        )
+        # Stored twice, as older syncs could do; the duplicate is dropped
+        for _ in range(2):
+            conn.execute(
+                """INSERT INTO device_events
+                   (entity_id, domain, new_state, timestamp, source, attributes_json)
+                   VALUES ('light.a', 'light', 'on', '2024-01-15T18:30:00.500000',
+                           'external', '{"brightness": 255}')"""
+            )
+        conn.commit()
+        conn.close()
+
+        db = PatternDatabase(db_path)
+        events = db.get_events_in_range(
+            datetime(2024, 1, 15), datetime(2024, 1, 16)
+        )
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].timestamp, datetime(2024, 1, 15, 18, 30, 0, 500000))
+        self.assertEqual(events[0].attributes, {"brightness": 255})
+        with db._get_connection() as conn:
+            column_types = {
+                row["name"]: row["type"]
+                for row in conn.execute("PRAGMA table_info(device_events)")
+            }
+            tables = {
+                row["name"]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")
+            }
+        self.assertEqual(column_types["timestamp"], "INTEGER")
+        self.assertNotIn("device_events_legacy", tables)
+
     def test_insert_events_batch(self):
         """Test batch event insertion."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         db = self._get_test_db()
 
+        # Known-good fixture data, so skip Pydantic validation
         events = [
-            DeviceEvent(
+            DeviceEvent.model_construct(
                 entity_id=f"light.room_{i}",
                 domain="light",
                 new_state="on",
-                timestamp=datetime.utcnow() - timedelta(minutes=i),
+                timestamp=NOW - timedelta(minutes=i),
                 source=EventSource.EXTERNAL,
             )
             for i in range(10)
@@ -213,10 +375,75 @@ class TestPatternDatabase(unittest.TestCase):
         total = db.get_event_count()
         self.assertEqual(total, 10)
 
+    def test_insert_events_batch_single_transaction(self):
+        """Test that a batch insert commits once, not once per event."""
+        db = self._get_test_db()
+        events = [
+            DeviceEvent.model_construct(
+                entity_id=f"light.room_{i}",
+                domain="light",
+                new_state="on",
+                timestamp=NOW,
+                source=EventSource.EXTERNAL,
+            )
+            for i in range(20)
+        ]
+
+        statements = []
+        with db._get_connection() as conn:
+            conn.set_trace_callback(statements.append)
+            self.addCleanup(conn.set_trace_callback, None)
+
+        db.insert_events_batch(events)
+
+        self.assertEqual(statements[0], "BEGIN IMMEDIATE")
+        self.assertEqual(statements[-1], "COMMIT")
+        self.assertEqual(statements.count("COMMIT"), 1)
+        self.assertEqual(len(statements), len(events) + 2)
+
+    def test_insert_events_batch_skips_duplicates(self):
+        """Test that re-inserting the same events (e.g. a re-synced history) is a no-op."""
+        db = self._get_test_db()
+        events = [
+            DeviceEvent.model_construct(
+                entity_id="light.kitchen",
+                domain="light",
+                new_state=state,
+                timestamp=NOW - timedelta(minutes=i),
+                source=EventSource.EXTERNAL,
+            )
+            for i, state in enumerate(("on", "off", "on"))
+        ]
+
+        self.assertEqual(db.insert_events_batch(events), 3)
+        self.assertEqual(db.insert_events_batch(events), 0)
+        self.assertEqual(db.insert_events_batch(events[:1] + events[:1]), 0)
+        # Matched to the second, so a copy a few microseconds off is skipped too,
+        # and insert_event hands back the stored event's ID
+        nearby = events[0].model_copy(
+            update={"timestamp": events[0].timestamp + timedelta(microseconds=498)}
+        )
+        self.assertEqual(db.insert_events_batch([nearby]), 0)
+        self.assertEqual(db.insert_event(nearby), 1)
+        self.assertEqual(db.get_event_count(), 3)
+
+    def test_transaction_rollback(self):
+        """Test that a failed transaction leaves no partial writes."""
+        db = self._get_test_db()
+
+        with self.assertRaises(RuntimeError):
+            with db.transaction() as conn:
+                conn.execute(
+                    """INSERT INTO device_events
+                       (entity_id, domain, new_state, timestamp, source)
+                       VALUES ('light.a', 'light', 'on', 1705343400000000, 'external')"""
+                )
+                raise RuntimeError("boom")
+
+        self.assertEqual(db.get_event_count(), 0)
+
     def test_insert_and_retrieve_pattern(self):
         """Test inserting and retrieving patterns."""
-        from app.patterns.models import DetectedPattern, PatternType
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -225,8 +452,8 @@ class TestPatternDatabase(unittest.TestCase):
             pattern_data={"action": "on", "average_trigger_time": "18:30"},
             confidence=0.8,
             occurrence_count=10,
-            first_seen=datetime.utcnow() - timedelta(days=7),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW - timedelta(days=7),
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -236,11 +463,11 @@ class TestPatternDatabase(unittest.TestCase):
         patterns = db.get_active_patterns(min_confidence=0.5)
         self.assertEqual(len(patterns), 1)
         self.assertEqual(patterns[0].confidence, 0.8)
+        self.assertEqual(patterns[0].first_seen, pattern.first_seen)
+        self.assertEqual(db.get_pattern_by_id(pattern_id).last_seen, pattern.last_seen)
 
     def test_update_pattern(self):
         """Test updating pattern."""
-        from app.patterns.models import DetectedPattern, PatternType
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -249,8 +476,8 @@ class TestPatternDatabase(unittest.TestCase):
             pattern_data={"sequence": []},
             confidence=0.5,
             occurrence_count=3,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -267,8 +494,6 @@ class TestPatternDatabase(unittest.TestCase):
 
     def test_deactivate_pattern(self):
         """Test deactivating a pattern."""
-        from app.patterns.models import DetectedPattern, PatternType
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -277,8 +502,8 @@ class TestPatternDatabase(unittest.TestCase):
             pattern_data={},
             confidence=0.7,
             occurrence_count=5,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -290,8 +515,6 @@ class TestPatternDatabase(unittest.TestCase):
 
     def test_user_preferences(self):
         """Test user preference storage."""
-        from app.patterns.models import DetectedPattern, PatternType
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -300,8 +523,8 @@ class TestPatternDatabase(unittest.TestCase):
             pattern_data={},
             confidence=0.6,
             occurrence_count=4,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -319,41 +542,89 @@ class TestPatternDatabase(unittest.TestCase):
         self.assertIsNone(last_sync)
 
         # Update sync
-        now = datetime.utcnow()
-        db.update_sync_metadata(now, 100, 500)
+        db.update_sync_metadata(NOW, 100, 500)
 
         last_sync = db.get_last_sync_timestamp()
-        self.assertIsNotNone(last_sync)
+        self.assertEqual(last_sync, NOW)
+
+        # Stored as ISO text, converted back by sqlite3
+        with db._get_connection() as conn:
+            stored = conn.execute(
+                "SELECT last_sync_timestamp FROM sync_metadata WHERE id = 1"
+            ).fetchone()[0]
+        self.assertEqual(stored, NOW.isoformat())
+
+    def test_reset(self):
+        """Test that reset empties all tables but keeps the schema usable."""
+        db = self._get_test_db()
+        db.insert_event(
+            DeviceEvent(
+                entity_id="light.test",
+                domain="light",
+                new_state="on",
+                timestamp=NOW,
+                source=EventSource.ASSISTANT,
+            )
+        )
+        db.update_sync_metadata(NOW, 1, 10)
+
+        db.reset()
+
+        self.assertEqual(db.get_event_count(), 0)
+        self.assertIsNone(db.get_last_sync_timestamp())
+
+    def test_events_in_range_uses_index(self):
+        """Test that range queries are served by a timestamp index."""
+        db = self._get_test_db()
+
+        for filters, index in (
+            ({}, "idx_events_timestamp"),
+            ({"entity_id": "light.test"}, "idx_events_entity_timestamp"),
+            ({"domain": "light"}, "idx_events_domain"),
+        ):
+            with self.subTest(**filters), db._get_connection() as conn:
+                # The trace holds the statement as run, with its integer bounds inlined
+                statements = []
+                conn.set_trace_callback(statements.append)
+                try:
+                    db.get_events_in_range(NOW - timedelta(days=1), NOW, **filters)
+                finally:
+                    conn.set_trace_callback(None)
+
+                plan = conn.execute("EXPLAIN QUERY PLAN " + statements[0]).fetchall()
+                detail = " ".join(row["detail"] for row in plan)
+                self.assertIn(f"USING INDEX {index}", detail)
+                self.assertNotIn("TEMP B-TREE", detail)
 
     def test_cleanup_old_events(self):
         """Test cleanup of old events."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         db = self._get_test_db()
 
+        now = datetime.utcnow()
+
         # Insert old events
         old_events = [
-            DeviceEvent(
+            DeviceEvent.model_construct(
                 entity_id="light.old",
                 domain="light",
                 new_state="on",
-                timestamp=datetime.utcnow() - timedelta(days=60),
+                timestamp=now - timedelta(days=60, minutes=i),
                 source=EventSource.EXTERNAL,
             )
-            for _ in range(5)
+            for i in range(5)
         ]
         db.insert_events_batch(old_events)
 
         # Insert recent events
         recent_events = [
-            DeviceEvent(
+            DeviceEvent.model_construct(
                 entity_id="light.recent",
                 domain="light",
                 new_state="on",
-                timestamp=datetime.utcnow() - timedelta(days=5),
+                timestamp=now - timedelta(days=5, minutes=i),
                 source=EventSource.EXTERNAL,
             )
-            for _ in range(3)
+            for i in range(3)
         ]
         db.insert_events_batch(recent_events)
 
@@ -367,8 +638,6 @@ class TestPatternDatabase(unittest.TestCase):
 
     def test_get_stats(self):
         """Test statistics retrieval."""
-        from app.patterns.models import DeviceEvent, EventSource
-
         db = self._get_test_db()
 
         # Insert events from different sources
@@ -377,21 +646,21 @@ class TestPatternDatabase(unittest.TestCase):
                 entity_id="light.test",
                 domain="light",
                 new_state="on",
-                timestamp=datetime.utcnow(),
+                timestamp=NOW,
                 source=EventSource.ASSISTANT,
             ),
             DeviceEvent(
                 entity_id="switch.test",
                 domain="switch",
                 new_state="on",
-                timestamp=datetime.utcnow(),
+                timestamp=NOW,
                 source=EventSource.EXTERNAL,
             ),
             DeviceEvent(
                 entity_id="light.test2",
                 domain="light",
                 new_state="off",
-                timestamp=datetime.utcnow(),
+                timestamp=NOW,
                 source=EventSource.EXTERNAL,
             ),
         ]
@@ -403,77 +672,50 @@ class TestPatternDatabase(unittest.TestCase):
         self.assertIn("external", stats["events_by_source"])
 
 
-class TestPatternDetector(unittest.TestCase):
+class TestPatternDetector(DatabaseTestCase):
     """Tests for pattern detection algorithms."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
+    def test_mean_stdev(self):
+        """Test the float mean/stdev helper against the statistics module."""
+        values = [1080, 1095, 1102, 1110, 1075]
+        mean, stdev = _mean_stdev(values)
 
-    def tearDown(self):
-        """Clean up."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    def _get_test_db(self):
-        """Get a test database instance."""
-        from app.patterns.database import PatternDatabase
-
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-        return db
+        self.assertAlmostEqual(mean, statistics.mean(values))
+        self.assertAlmostEqual(stdev, statistics.stdev(values))
+        self.assertEqual(_mean_stdev([42]), (42.0, 0.0))
 
     def test_detect_time_based_pattern(self):
         """Test detection of time-based patterns."""
-        from app.patterns.models import DeviceEvent, EventSource
-        from app.patterns.detector import PatternDetector
-
-        db = self._get_test_db()
-
         # Create events at similar times on the SAME days of week
         # Pattern detection requires 2+ events on the same day of week
         # January 2024: 1st is Monday, 8th is Monday, 15th is Monday, etc.
-        events = []
-
-        # Create 3 events on Mondays around 6:30 PM
-        for week in range(3):
-            monday = datetime(2024, 1, 1 + week * 7, 18, 30, 0) + timedelta(minutes=week * 3)
-            events.append(
-                DeviceEvent(
-                    entity_id="light.living_room",
-                    domain="light",
-                    old_state="off",
-                    new_state="on",
-                    timestamp=monday,
-                    source=EventSource.EXTERNAL,
-                )
-            )
-
-        # Create 3 events on Tuesdays around 6:30 PM
-        for week in range(3):
-            tuesday = datetime(2024, 1, 2 + week * 7, 18, 35, 0) + timedelta(minutes=week * 2)
-            events.append(
-                DeviceEvent(
-                    entity_id="light.living_room",
-                    domain="light",
-                    old_state="off",
-                    new_state="on",
-                    timestamp=tuesday,
-                    source=EventSource.EXTERNAL,
-                )
+        # 3 events on Mondays and 3 on Tuesdays, around 6:30 PM
+        timestamps = [
+            datetime(2024, 1, 1, 18, 30) + timedelta(days=7 * week, minutes=3 * week)
+            for week in range(3)
+        ] + [
+            datetime(2024, 1, 2, 18, 35) + timedelta(days=7 * week, minutes=2 * week)
+            for week in range(3)
+        ]
+        events = [
+            DeviceEvent.model_construct(
+                entity_id="light.living_room",
+                domain="light",
+                old_state="off",
+                new_state="on",
+                timestamp=timestamp,
+                source=EventSource.EXTERNAL,
             )
+            for timestamp in timestamps
+        ]
 
-        db.insert_events_batch(events)
-
-        # Create detector with mocked db
+        # The detector works on the list directly, no database round trip needed
         detector = PatternDetector()
-        detector.db = db
 
         # Detect patterns
         patterns = detector._detect_time_patterns(events)
 
-        self.assertGreater(len(patterns), 0)
+        self.assertTrue(patterns)
         time_pattern = patterns[0]
         self.assertEqual(time_pattern.entity_ids, ["light.living_room"])
         self.assertEqual(time_pattern.pattern_data["action"], "on")
@@ -481,48 +723,41 @@ class TestPatternDetector(unittest.TestCase):
 
     def test_detect_sequential_pattern(self):
         """Test detection of sequential patterns."""
-        from app.patterns.models import DeviceEvent, EventSource
-        from app.patterns.detector import PatternDetector
-
-        db = self._get_test_db()
-
         # Create sequential events (door unlock -> hallway light)
+        # 5 occurrences: the door unlocks, the hallway light turns on 30-50
+        # seconds later
         base_time = datetime(2024, 1, 15, 18, 0, 0)
+        unlock_times = [base_time + timedelta(days=i) for i in range(5)]
         events = []
 
-        for i in range(5):  # 5 occurrences
-            # Door unlocks
+        for i, unlocked_at in enumerate(unlock_times):
             events.append(
-                DeviceEvent(
+                DeviceEvent.model_construct(
                     entity_id="lock.front_door",
                     domain="lock",
                     old_state="locked",
                     new_state="unlocked",
-                    timestamp=base_time + timedelta(days=i),
+                    timestamp=unlocked_at,
                     source=EventSource.EXTERNAL,
                 )
             )
-            # Hallway light turns on 30-60 seconds later
             events.append(
-                DeviceEvent(
+                DeviceEvent.model_construct(
                     entity_id="light.hallway",
                     domain="light",
                     old_state="off",
                     new_state="on",
-                    timestamp=base_time + timedelta(days=i, seconds=30 + i * 5),
+                    timestamp=unlocked_at + timedelta(seconds=30 + i * 5),
                     source=EventSource.EXTERNAL,
                 )
             )
 
-        db.insert_events_batch(events)
-
         detector = PatternDetector()
-        detector.db = db
 
         # Detect sequential patterns
         patterns = detector._detect_sequential_patterns(events)
 
-        self.assertGreater(len(patterns), 0)
+        self.assertTrue(patterns)
 
         # Find the lock->light pattern
         lock_light_pattern = None
@@ -536,58 +771,44 @@ class TestPatternDetector(unittest.TestCase):
 
     def test_no_pattern_with_insufficient_data(self):
         """Test that patterns aren't detected with insufficient data."""
-        from app.patterns.models import DeviceEvent, EventSource
-        from app.patterns.detector import PatternDetector
-
-        db = self._get_test_db()
-
         # Only 2 events (below minimum threshold of 3)
         events = [
-            DeviceEvent(
+            DeviceEvent.model_construct(
                 entity_id="light.random",
                 domain="light",
                 new_state="on",
-                timestamp=datetime.utcnow() - timedelta(days=i),
+                timestamp=NOW - timedelta(days=i),
                 source=EventSource.EXTERNAL,
             )
             for i in range(2)
         ]
 
-        db.insert_events_batch(events)
-
         detector = PatternDetector()
-        detector.db = db
 
         patterns = detector._detect_time_patterns(events)
         self.assertEqual(len(patterns), 0)
 
     def test_pattern_persistence(self):
         """Test that patterns are persisted to database."""
-        from app.patterns.models import DeviceEvent, EventSource, PatternType
-        from app.patterns.detector import PatternDetector
-
         db = self._get_test_db()
 
         # Create events within the last 14 days (within lookback period)
         now = datetime.utcnow()
-        events = []
 
-        # Create 4 events at 7 AM on different days within last 2 weeks
-        for i in range(4):
-            # Go back i*2 days to spread across the lookback period
-            event_time = now - timedelta(days=i * 2, hours=now.hour - 7, minutes=now.minute)
-            events.append(
-                DeviceEvent(
-                    entity_id="switch.coffee_maker",
-                    domain="switch",
-                    old_state="off",
-                    new_state="on",
-                    timestamp=event_time,
-                    source=EventSource.ASSISTANT,
-                )
+        # Create 4 events at 7 AM on different days within last 2 weeks,
+        # going back i*2 days to spread across the lookback period
+        self._seed_events(
+            (
+                "switch.coffee_maker",
+                "switch",
+                "off",
+                "on",
+                now - timedelta(days=i * 2, hours=now.hour - 7, minutes=now.minute),
+                EventSource.ASSISTANT.value,
             )
-
-        db.insert_events_batch(events)
+            for i in range(4)
+        )
+        self.assertEqual(db.get_event_count(), 4)
 
         detector = PatternDetector()
         detector.db = db
@@ -602,32 +823,11 @@ class TestPatternDetector(unittest.TestCase):
         self.assertIsNotNone(patterns)
 
 
-class TestSuggestionGenerator(unittest.TestCase):
+class TestSuggestionGenerator(DatabaseTestCase):
     """Tests for suggestion generation."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    def _get_test_db(self):
-        """Get a test database instance."""
-        from app.patterns.database import PatternDatabase
-
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-        return db
-
     def test_time_pattern_suggestion(self):
         """Test suggestion generation from time-based pattern."""
-        from app.patterns.models import DetectedPattern, PatternType
-        from app.patterns.suggestions import SuggestionGenerator
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -643,8 +843,8 @@ class TestSuggestionGenerator(unittest.TestCase):
             },
             confidence=0.8,
             occurrence_count=10,
-            first_seen=datetime.utcnow() - timedelta(days=14),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW - timedelta(days=14),
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -664,9 +864,6 @@ class TestSuggestionGenerator(unittest.TestCase):
 
     def test_sequential_pattern_suggestion(self):
         """Test suggestion generation from sequential pattern."""
-        from app.patterns.models import DetectedPattern, PatternType
-        from app.patterns.suggestions import SuggestionGenerator
-
         db = self._get_test_db()
 
         pattern = DetectedPattern(
@@ -682,8 +879,8 @@ class TestSuggestionGenerator(unittest.TestCase):
             },
             confidence=0.7,
             occurrence_count=8,
-            first_seen=datetime.utcnow() - timedelta(days=7),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW - timedelta(days=7),
+            last_seen=NOW,
         )
 
         pattern_id = db.insert_pattern(pattern)
@@ -705,9 +902,6 @@ class TestSuggestionGenerator(unittest.TestCase):
 
     def test_generate_suggestions_filters_dismissed(self):
         """Test that dismissed patterns are filtered out."""
-        from app.patterns.models import DetectedPattern, PatternType
-        from app.patterns.suggestions import SuggestionGenerator
-
         db = self._get_test_db()
 
         # Create two patterns
@@ -717,8 +911,8 @@ class TestSuggestionGenerator(unittest.TestCase):
             pattern_data={"action": "on", "average_trigger_time": "08:00", "days_of_week": []},
             confidence=0.8,
             occurrence_count=5,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
         pattern2 = DetectedPattern(
             pattern_type=PatternType.TIME_BASED,
@@ -726,8 +920,8 @@ class TestSuggestionGenerator(unittest.TestCase):
             pattern_data={"action": "on", "average_trigger_time": "09:00", "days_of_week": []},
             confidence=0.9,
             occurrence_count=10,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
 
         id1 = db.insert_pattern(pattern1)
@@ -747,8 +941,6 @@ class TestSuggestionGenerator(unittest.TestCase):
 
     def test_format_days(self):
         """Test day formatting."""
-        from app.patterns.suggestions import SuggestionGenerator
-
         generator = SuggestionGenerator()
 
         self.assertEqual(generator._format_days([0, 1, 2, 3, 4]), "weekdays")
@@ -757,36 +949,29 @@ class TestSuggestionGenerator(unittest.TestCase):
         self.assertEqual(generator._format_days([0, 2, 4]), "Monday, Wednesday, Friday")
 
 
-class TestEventCollector(unittest.TestCase):
+class TestEventCollector(DatabaseTestCase):
     """Tests for event collection."""
 
-    def setUp(self):
-        """Set up test fixtures."""
-        self.temp_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    def _get_test_db(self):
-        """Get a test database instance."""
-        from app.patterns.database import PatternDatabase
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # The collector holds no per-test state, so share one (and its HTTP
+        # client) per class
+        cls.http_client = httpx.AsyncClient()
+        cls.collector = EventCollector(
+            "http://localhost:8123", "test_token", client=cls.http_client
+        )
+        cls.collector.db = cls.db
 
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-        return db
+    @classmethod
+    def tearDownClass(cls):
+        asyncio.run(cls.http_client.aclose())
+        super().tearDownClass()
 
     def test_record_assistant_event(self):
         """Test recording assistant-triggered events."""
-        from app.patterns.collector import EventCollector
-        from app.patterns.models import EventSource
-
         db = self._get_test_db()
-
-        collector = EventCollector("http://localhost:8123", "test_token")
-        collector.db = db
+        collector = self.collector
 
         event_id = collector.record_assistant_event(
             entity_id="light.bedroom",
@@ -807,11 +992,52 @@ class TestEventCollector(unittest.TestCase):
         self.assertEqual(events[0].entity_id, "light.bedroom")
         self.assertEqual(events[0].source, EventSource.ASSISTANT)
 
+    def test_history_sync_skips_assistant_events(self):
+        """Test that the history copy of an assistant change is not stored again."""
+        db = self._get_test_db()
+        self.collector.record_assistant_event(
+            entity_id="light.bedroom", old_state="off", new_state="on"
+        )
+        recorded = db.get_events_in_range(NOW - timedelta(days=1), datetime.utcnow())[0]
+        # HA's last_changed lands in the same second, microseconds apart
+        changed_at = recorded.timestamp.replace(
+            microsecond=(recorded.timestamp.microsecond + 1) % 1_000_000
+        )
+        history = [
+            [
+                {
+                    "entity_id": "light.bedroom",
+                    "state": "off",
+                    "last_changed": f"{(changed_at - timedelta(minutes=5)).isoformat()}+00:00",
+                    "context": {},
+                },
+                {
+                    "entity_id": "light.bedroom",
+                    "state": "on",
+                    "last_changed": f"{changed_at.isoformat()}+00:00",
+                    "context": {"user_id": "abc123"},
+                },
+            ]
+        ]
+
+        async def sync():
+            transport = httpx.MockTransport(lambda request: httpx.Response(200, json=history))
+            async with httpx.AsyncClient(transport=transport) as client:
+                collector = EventCollector("http://localhost:8123", "test_token", client=client)
+                collector.db = db
+                return await collector.sync_from_history_api(entity_ids=["light.bedroom"])
+
+        inserted, error = asyncio.run(sync())
+
+        self.assertIsNone(error)
+        self.assertEqual(inserted, 1)
+        events = db.get_events_in_range(NOW - timedelta(days=1), datetime.utcnow())
+        self.assertEqual([e.new_state for e in events], ["off", "on"])
+        self.assertEqual(events[1].source, EventSource.ASSISTANT)
+
     def test_parse_history_data(self):
         """Test parsing Home Assistant history API response."""
-        from app.patterns.collector import EventCollector
-
-        collector = EventCollector("http://localhost:8123", "test_token")
+        collector = self.collector
 
         # Mock history API response format
         history_data = [
@@ -856,10 +1082,7 @@ class TestEventCollector(unittest.TestCase):
 
     def test_determine_source(self):
         """Test source determination from context."""
-        from app.patterns.collector import EventCollector
-        from app.patterns.models import EventSource
-
-        collector = EventCollector("http://localhost:8123", "test_token")
+        collector = self.collector
 
         # User triggered
         self.assertEqual(
@@ -881,40 +1104,12 @@ class TestEventCollector(unittest.TestCase):
 
     def test_tracked_domains_filter(self):
         """Test that only tracked domains are collected."""
-        from app.patterns.collector import EventCollector
-
-        collector = EventCollector("http://localhost:8123", "test_token")
+        collector = self.collector
 
         # History with tracked and non-tracked domains
-        history_data = [
-            [
-                {
-                    "entity_id": "light.room",
-                    "state": "on",
-                    "last_changed": "2024-01-15T10:00:00+00:00",
-                    "context": {},
-                    "attributes": {},
-                },
-            ],
-            [
-                {
-                    "entity_id": "sensor.temperature",  # Not tracked
-                    "state": "22.5",
-                    "last_changed": "2024-01-15T10:00:00+00:00",
-                    "context": {},
-                    "attributes": {},
-                },
-            ],
-            [
-                {
-                    "entity_id": "binary_sensor.motion",  # Not tracked
-                    "state": "on",
-                    "last_changed": "2024-01-15T10:00:00+00:00",
-                    "context": {},
-                    "attributes": {},
-                },
-            ],
-        ]
+        history_data = _make_history(
+            ["light.room", "sensor.temperature", "binary_sensor.motion"]
+        )
 
         events = collector._parse_history_data(history_data)
 
@@ -922,259 +1117,228 @@ class TestEventCollector(unittest.TestCase):
         self.assertEqual(len(events), 1)
         self.assertEqual(events[0].entity_id, "light.room")
 
+    def test_tracked_domains_filter_bulk(self):
+        """Test domain filtering over a large history response."""
+        n = 2000
+        history_data = _make_history(
+            [f"light.room_{i}" for i in range(n)]
+            + [f"sensor.temperature_{i}" for i in range(n)]
+        )
+
+        events = self.collector._parse_history_data(history_data)
+
+        self.assertEqual(len(events), n)
+        self.assertTrue(all(e.domain == "light" for e in events))
+
+    def test_shared_http_client(self):
+        """Test that an injected HTTP client is reused and left open."""
+
+        async def run_test():
+            async with self.collector._http_client() as client:
+                self.assertIs(client, self.http_client)
+            self.assertFalse(self.http_client.is_closed)
+
+        asyncio.run(run_test())
+
 
-class TestPatternScheduler(unittest.TestCase):
+class TestPatternScheduler(unittest.IsolatedAsyncioTestCase):
     """Tests for the pattern scheduler."""
 
+    def tearDown(self):
+        """Reset the global scheduler, even after a failed test."""
+        stop_pattern_scheduler()
+
     def test_scheduler_initialization(self):
         """Test scheduler initialization."""
-        from app.patterns.scheduler import PatternScheduler
-
         scheduler = PatternScheduler("http://localhost:8123", "test_token")
 
         self.assertEqual(scheduler.ha_url, "http://localhost:8123")
         self.assertEqual(scheduler.ha_token, "test_token")
         self.assertFalse(scheduler._running)
 
-    def test_scheduler_start_stop(self):
+    async def test_scheduler_start_stop(self):
         """Test starting and stopping scheduler."""
-        import asyncio
-        from app.patterns.scheduler import PatternScheduler
+        scheduler = PatternScheduler("http://localhost:8123", "test_token")
 
-        async def run_test():
-            scheduler = PatternScheduler("http://localhost:8123", "test_token")
+        # Start
+        scheduler.start()
+        self.assertTrue(scheduler._running)
+        self.assertIsNotNone(scheduler._sync_task)
+        self.assertIsNotNone(scheduler._detection_task)
 
-            # Start
-            scheduler.start()
-            self.assertTrue(scheduler._running)
-            self.assertIsNotNone(scheduler._sync_task)
-            self.assertIsNotNone(scheduler._detection_task)
+        # Yield one loop tick so the tasks start running
+        await asyncio.sleep(0)
 
-            # Give tasks a moment to start
-            await asyncio.sleep(0.1)
+        # Stop
+        scheduler.stop()
+        self.assertFalse(scheduler._running)
 
-            # Stop
-            scheduler.stop()
-            self.assertFalse(scheduler._running)
+    async def test_sync_uses_scheduler_client(self):
+        """Test that syncs go through the scheduler's pooled client."""
+        requests = []
 
-        # Run the async test
-        asyncio.run(run_test())
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json=[])
 
-    def test_singleton_pattern(self):
-        """Test scheduler singleton pattern."""
-        from app.patterns.scheduler import (
-            init_pattern_scheduler,
-            get_pattern_scheduler,
-            stop_pattern_scheduler,
-        )
+        scheduler = PatternScheduler("http://localhost:8123", "test_token")
+        scheduler._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(scheduler._client.aclose)
+
+        self.assertEqual(await scheduler.run_sync_now(), (0, None))
+        self.assertEqual([r.url.path for r in requests], ["/api/states"])
+
+    async def test_sync_loop_closes_client(self):
+        """Test that stopping the scheduler closes the sync loop's client."""
+        scheduler = PatternScheduler("http://localhost:8123", "test_token")
+        scheduler._run_sync = AsyncMock(return_value=(0, None))
 
-        # Initialize
+        scheduler.start()
+        await asyncio.sleep(0)
+        client = scheduler._client
+        task = scheduler._sync_task
+        scheduler.stop()
+        await asyncio.gather(task, return_exceptions=True)
+
+        self.assertTrue(client.is_closed)
+        self.assertIsNone(scheduler._client)
+
+    @patch("app.patterns.scheduler.PatternScheduler")
+    def test_singleton_pattern(self, mock_scheduler_cls):
+        """Test scheduler singleton pattern."""
+        # Only identity matters here, so no real scheduler is built
         scheduler1 = init_pattern_scheduler("http://localhost:8123", "token1")
         scheduler2 = get_pattern_scheduler()
 
+        self.assertIs(scheduler1, mock_scheduler_cls.return_value)
         self.assertIs(scheduler1, scheduler2)
 
-        # Clean up
-        stop_pattern_scheduler()
-
 
-class TestAPIEndpoints(unittest.TestCase):
+class TestAPIEndpoints(unittest.IsolatedAsyncioTestCase):
     """Tests for pattern tracking API endpoints."""
 
-    def setUp(self):
-        """Set up test client."""
-        self.temp_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
-
-    @pytest.mark.asyncio
-    async def test_get_pattern_insights(self):
+    @patch("app.patterns.database.get_pattern_db", autospec=True)
+    async def test_get_pattern_insights(self, mock_get_db):
         """Test /api/patterns/insights endpoint."""
-        from app.patterns.database import PatternDatabase
-        from app.patterns.models import DetectedPattern, PatternType
-
-        # Create test database
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-
-        # Insert test pattern
         pattern = DetectedPattern(
+            id=1,
             pattern_type=PatternType.TIME_BASED,
             entity_ids=["light.test"],
             pattern_data={"action": "on"},
             confidence=0.8,
             occurrence_count=5,
-            first_seen=datetime.utcnow(),
-            last_seen=datetime.utcnow(),
+            first_seen=NOW,
+            last_seen=NOW,
         )
-        db.insert_pattern(pattern)
 
-        # Mock get_pattern_db to return our test db
-        with patch("app.patterns.database.get_pattern_db", return_value=db):
-            from app.main import get_pattern_insights
+        # Only the API shape is under test; storage is covered by TestPatternDatabase
+        db = mock_get_db.return_value = MagicMock(spec=PatternDatabase)
+        db.get_active_patterns.return_value = [pattern]
+        db.get_last_sync_timestamp.return_value = NOW
 
-            result = await get_pattern_insights()
+        result = await get_pattern_insights()
 
-            self.assertIn("patterns", result)
-            self.assertIn("pattern_count", result)
-            self.assertEqual(result["pattern_count"], 1)
+        self.assertIn("patterns", result)
+        self.assertIn("pattern_count", result)
+        self.assertEqual(result["pattern_count"], 1)
+        self.assertEqual(result["patterns"][0]["entities"], ["light.test"])
+        self.assertEqual(result["last_sync"], NOW.isoformat() + "Z")
 
 
-class TestIntegration(unittest.TestCase):
+class TestIntegration(DatabaseTestCase):
     """Integration tests for the full pattern tracking flow."""
 
-    def setUp(self):
-        """Set up test environment."""
-        self.temp_dir = tempfile.mkdtemp()
-
-    def tearDown(self):
-        """Clean up."""
-        import shutil
-        shutil.rmtree(self.temp_dir, ignore_errors=True)
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Detection looks back from the real clock, so events are relative to
+        # it; read it once for the class
+        cls.now = datetime.utcnow()
+        # Detector and generator keep no state besides the database; share them
+        cls.detector = PatternDetector()
+        cls.detector.db = cls.db
+        cls.generator = SuggestionGenerator()
+        cls.generator.db = cls.db
+
+    def _run_full_flow(self, events):
+        """Store events, detect patterns and generate suggestions from them."""
+        self.db.insert_events_batch(events)
+        patterns = self.detector.detect_all_patterns(lookback_days=30)
+        suggestions = self.generator.generate_suggestions(min_confidence=0.2)  # Lower threshold
+        return patterns, suggestions
 
     def test_full_flow_time_pattern(self):
         """Test full flow: events -> detection -> suggestions."""
-        from app.patterns.database import PatternDatabase
-        from app.patterns.models import DeviceEvent, EventSource
-        from app.patterns.detector import PatternDetector
-        from app.patterns.suggestions import SuggestionGenerator
-
-        # Set up database
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-
         # Create realistic event data within the lookback period
-        now = datetime.utcnow()
-        events = []
+        seven_pm = self.now.replace(hour=19, minute=0, second=0, microsecond=0)
 
         # Create multiple events at similar times (around 7 PM) on different days
-        # The key is having events with similar time-of-day across multiple days
-        for day in range(10):
-            # Vary the time slightly (7:00 PM +/- 15 minutes)
-            event_time = now.replace(hour=19, minute=0, second=0, microsecond=0) - timedelta(days=day)
-            event_time = event_time + timedelta(minutes=(day % 5) * 3)  # 0, 3, 6, 9, 12 min variation
-            events.append(
-                DeviceEvent(
-                    entity_id="light.living_room",
-                    domain="light",
-                    old_state="off",
-                    new_state="on",
-                    timestamp=event_time,
-                    source=EventSource.EXTERNAL,
-                )
+        # The key is having events with similar time-of-day across multiple days.
+        # Vary the time slightly: 0, 3, 6, 9, 12 min after 7:00 PM
+        events = [
+            DeviceEvent(
+                entity_id="light.living_room",
+                domain="light",
+                old_state="off",
+                new_state="on",
+                timestamp=seven_pm - timedelta(days=day) + timedelta(minutes=(day % 5) * 3),
+                source=EventSource.EXTERNAL,
             )
+            for day in range(10)
+        ]
 
-        db.insert_events_batch(events)
-
-        # Detect patterns
-        detector = PatternDetector()
-        detector.db = db
-        patterns = detector.detect_all_patterns(lookback_days=30)
+        patterns, suggestions = self._run_full_flow(events)
 
         # We should find at least one pattern given 10 events at similar times
-        self.assertGreater(len(patterns), 0)
-
-        # Generate suggestions
-        generator = SuggestionGenerator()
-        generator.db = db
-        suggestions = generator.generate_suggestions(min_confidence=0.2)  # Lower threshold
-
-        self.assertGreater(len(suggestions), 0)
+        self.assertTrue(patterns)
+        self.assertTrue(suggestions)
         self.assertIn("living room", suggestions[0].title.lower())
 
     def test_full_flow_sequential_pattern(self):
         """Test full flow for sequential patterns."""
-        from app.patterns.database import PatternDatabase
-        from app.patterns.models import DeviceEvent, EventSource
-        from app.patterns.detector import PatternDetector
-        from app.patterns.suggestions import SuggestionGenerator
-
-        db = PatternDatabase()
-        db.db_path = Path(self.temp_dir) / "test_patterns.db"
-        db._init_database()
-
         # Simulate: door unlocks -> light turns on within the lookback period
-        now = datetime.utcnow()
-        events = []
-
-        for day in range(10):
-            # Events from the past 10 days
-            t = now - timedelta(days=day, hours=day % 3)
-
-            # Door unlocks
-            events.append(
-                DeviceEvent(
-                    entity_id="lock.front_door",
-                    domain="lock",
-                    old_state="locked",
-                    new_state="unlocked",
-                    timestamp=t,
-                    source=EventSource.EXTERNAL,
-                )
+        unlocked_at = [self.now - timedelta(days=day, hours=day % 3) for day in range(10)]
+
+        def door_unlocks(day):
+            return DeviceEvent(
+                entity_id="lock.front_door",
+                domain="lock",
+                old_state="locked",
+                new_state="unlocked",
+                timestamp=unlocked_at[day],
+                source=EventSource.EXTERNAL,
             )
 
-            # Light turns on shortly after (30-60 seconds later)
-            events.append(
-                DeviceEvent(
-                    entity_id="light.entryway",
-                    domain="light",
-                    old_state="off",
-                    new_state="on",
-                    timestamp=t + timedelta(seconds=30 + day * 3),
-                    source=EventSource.EXTERNAL,
-                )
+        def light_turns_on(day):
+            # Shortly after the door (30-57 seconds later)
+            return DeviceEvent(
+                entity_id="light.entryway",
+                domain="light",
+                old_state="off",
+                new_state="on",
+                timestamp=unlocked_at[day] + timedelta(seconds=30 + day * 3),
+                source=EventSource.EXTERNAL,
             )
 
-        db.insert_events_batch(events)
+        # Events from the past 10 days
+        events = [
+            event for day in range(10) for event in (door_unlocks(day), light_turns_on(day))
+        ]
 
-        # Detect patterns
-        detector = PatternDetector()
-        detector.db = db
-        patterns = detector.detect_all_patterns(lookback_days=30)
+        patterns, suggestions = self._run_full_flow(events)
 
         # Should find sequential pattern
         seq_patterns = [p for p in patterns if p.pattern_type.value == "sequential"]
-        self.assertGreater(len(seq_patterns), 0)
-
-        # Generate suggestions
-        generator = SuggestionGenerator()
-        generator.db = db
-        suggestions = generator.generate_suggestions(min_confidence=0.2)
+        self.assertTrue(seq_patterns)
 
         # Should have suggestion for the sequence
-        self.assertGreater(len(suggestions), 0)
+        self.assertTrue(suggestions)
 
 
 def run_tests():
-    """Run all tests with verbose output."""
-    loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
-
-    # Add all test classes
-    test_classes = [
-        TestPatternModels,
-        TestPatternDatabase,
-        TestPatternDetector,
-        TestSuggestionGenerator,
-        TestEventCollector,
-        TestPatternScheduler,
-        TestIntegration,
-    ]
-
-    for test_class in test_classes:
-        tests = loader.loadTestsFromTestCase(test_class)
-        suite.addTests(tests)
-
-    # Run with verbosity
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
-
-    return result
+    """Run all tests with verbose output, hiding output from passing tests."""
+    program = unittest.main(module=__name__, verbosity=2, buffer=True, exit=False)
+    return program.result
 
 
 if __name__ == "__main__":